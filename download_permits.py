@@ -3,7 +3,7 @@ download_permits.py – הורדת בקשות להיתר בנייה לכפר ח
 ========================================================
 
 מוריד את כל מסמכי בקשות ההיתר מאתר שדות דן (SDAN).
-כל גוש רץ ב-thread נפרד עם Chrome driver משלו.
+הגושים רצים ב-threads; כל thread מחזיק Chrome driver משלו ומשתמש בו לכל הגושים שלו.
 
 שימוש::
 
@@ -16,7 +16,9 @@ download_permits.py – הורדת בקשות להיתר בנייה לכפר ח
 import argparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from sdan_common import KFAR_CHABAD_GUSHIM, process_gush
+from sdan_common import (
+    KFAR_CHABAD_GUSHIM, process_gush_shared, quit_shared_drivers, size_http_pool,
+)
 
 CATEGORY = "permits"
 DOWNLOAD_ROOT = "./kfar_chabad_data"
@@ -38,6 +40,7 @@ def main():
 
     gushim = args.gush if args.gush else KFAR_CHABAD_GUSHIM
     workers = min(args.workers, len(gushim))
+    size_http_pool(workers)
 
     print(f"╔══════════════════════════════════════════╗")
     print(f"║   בקשות להיתר בנייה – כפר חב\"ד          ║")
@@ -48,7 +51,7 @@ def main():
     results = []
     with ThreadPoolExecutor(max_workers=workers) as pool:
         futures = {
-            pool.submit(process_gush, g, CATEGORY, DOWNLOAD_ROOT): g
+            pool.submit(process_gush_shared, g, CATEGORY, DOWNLOAD_ROOT): g
             for g in gushim
         }
         for future in as_completed(futures):
@@ -64,6 +67,8 @@ def main():
                 print(f"\n✗ גוש {gush} נכשל: {e}")
                 results.append({"gush": gush, "files": 0, "errors": 1})
 
+    quit_shared_drivers()
+
     total_files = sum(r["files"] for r in results)
     total_errors = sum(r["errors"] for r in results)
     print(f"\n{'='*45}")
@@ -11,6 +11,7 @@ run_all.py – הרצת כל ההורדות: תכניות + היתרים + צי
 
     python run_all.py                        # הכל, 3 threads
     python run_all.py --workers 4            # 4 threads
+    python run_all.py --processes            # תכניות/היתרים ב-processes
     python run_all.py --category plans       # רק תכניות
     python run_all.py --category permits     # רק היתרים
     python run_all.py --category aerial      # רק צילומי אוויר
@@ -26,7 +27,10 @@ import os
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from sdan_common import KFAR_CHABAD_GUSHIM, process_gush
+from sdan_common import (
+    KFAR_CHABAD_GUSHIM, process_gush_shared, quit_shared_drivers, size_http_pool,
+    run_all as run_gushim_in_processes,
+)
 
 DOWNLOAD_ROOT = "./kfar_chabad_data"
 SDAN_CATEGORIES = ["plans", "permits"]
@@ -54,34 +58,45 @@ CATEGORY_NAMES = {
 }
 
 
-def run_sdan_category(category: str, gushim: list, workers: int):
-    """Run one SDAN category (plans/permits) with parallel threads."""
+def run_sdan_category(category: str, gushim: list, workers: int, processes: bool = False):
+    """Run one SDAN category (plans/permits) with parallel threads.
+
+    With *processes*, each gush runs in a worker process instead (own
+    Chrome + SQLite connection per process, no shared GIL).
+    """
     name = CATEGORY_NAMES.get(category, category)
     print(f"\n{'═'*50}")
     print(f"  {name}")
-    print(f"  {len(gushim)} גושים × {workers} threads")
+    print(f"  {len(gushim)} גושים × {workers} {'processes' if processes else 'threads'}")
     print(f"{'═'*50}\n")
 
     results = []
     start = time.time()
 
-    with ThreadPoolExecutor(max_workers=workers) as pool:
-        futures = {
-            pool.submit(process_gush, g, category, DOWNLOAD_ROOT): g
-            for g in gushim
-        }
-        for future in as_completed(futures):
-            gush = futures[future]
-            try:
-                stats = future.result()
-                results.append(stats)
-                print(
-                    f"  ✓ גוש {gush} – "
-                    f"{stats['files']} קבצים, {stats['errors']} שגיאות"
-                )
-            except Exception as e:
-                print(f"  ✗ גוש {gush} נכשל: {e}")
-                results.append({"gush": gush, "files": 0, "errors": 1})
+    if processes:
+        results = run_gushim_in_processes(
+            gushim, category, DOWNLOAD_ROOT, max_workers=workers
+        )
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(process_gush_shared, g, category, DOWNLOAD_ROOT): g
+                for g in gushim
+            }
+            for future in as_completed(futures):
+                gush = futures[future]
+                try:
+                    stats = future.result()
+                    results.append(stats)
+                    print(
+                        f"  ✓ גוש {gush} – "
+                        f"{stats['files']} קבצים, {stats['errors']} שגיאות"
+                    )
+                except Exception as e:
+                    print(f"  ✗ גוש {gush} נכשל: {e}")
+                    results.append({"gush": gush, "files": 0, "errors": 1})
+
+    quit_shared_drivers()
 
     elapsed = time.time() - start
     total_files = sum(r["files"] for r in results)
@@ -477,6 +492,10 @@ def main():
         "--workers", type=int, default=3,
         help="מספר threads במקביל (ברירת מחדל: 3)",
     )
+    parser.add_argument(
+        "--processes", action="store_true",
+        help="תכניות/היתרים: process לכל worker במקום threads (Chrome נפרד לכל אחד)",
+    )
     parser.add_argument(
         "--gush", type=int, nargs="+", default=None,
         help="גוש/ים ספציפיים (ברירת מחדל: כולם)",
@@ -510,6 +529,7 @@ def main():
     gushim = args.gush if args.gush else KFAR_CHABAD_GUSHIM
     categories = args.category if args.category else ALL_CATEGORIES
     workers = min(args.workers, len(gushim))
+    size_http_pool(workers)
 
     # Resolve aerial years
     from download_aerial import AERIAL_YEARS, DEFAULT_YEAR
@@ -568,7 +588,7 @@ def main():
     # ── Phase 2: SDAN categories (plans / permits – needs browser) ──
     sdan_cats = [c for c in categories if c in SDAN_CATEGORIES]
     for cat in sdan_cats:
-        results = run_sdan_category(cat, gushim, workers)
+        results = run_sdan_category(cat, gushim, workers, args.processes)
         all_results.extend(results)
 
     # ── Phase 2.5: Playwright-based downloads ──
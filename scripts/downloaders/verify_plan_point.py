@@ -16,10 +16,9 @@ def point_in_ring(px: float, py: float, ring: list[tuple[float, float]]) -> bool
     for i in range(len(ring) - 1):
         x1, y1 = ring[i]
         x2, y2 = ring[i + 1]
-        intersects = ((y1 > py) != (y2 > py)) and (
-            px < (x2 - x1) * (py - y1) / ((y2 - y1) or 1e-12) + x1
-        )
-        if intersects:
+        # PNPOLY: the first clause excludes horizontal edges (y1 == y2),
+        # so the division below can never hit a zero divisor.
+        if ((y1 > py) != (y2 > py)) and (px < (x2 - x1) * (py - y1) / (y2 - y1) + x1):
             inside = not inside
     return inside
 
@@ -3,18 +3,25 @@ upload_files_to_storage.py – Resumable background uploader to Supabase Storage
 ===============================================================================
 Uploads all files from kfar_chabad_data/ (<=15MB) to Supabase Storage bucket.
 Saves progress to a JSON file so it can resume if interrupted.
+Files over 1MB go through the TUS resumable endpoint, so an interrupted
+upload continues from the last acknowledged offset on the next run.
 
 Usage:
   python scripts/upload_files_to_storage.py          # upload all
   python scripts/upload_files_to_storage.py --reset   # reset progress & start fresh
+  python scripts/upload_files_to_storage.py --gzip    # gzip text files (json/csv/...) before upload
 """
 
+import base64
+import gzip
+import io
 import json
 import mimetypes
 import os
 import sys
 import time
 import hashlib
+import threading
 import urllib.parse
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -44,17 +51,31 @@ SUPABASE_ANON_KEY = (
 )
 
 STORAGE_URL = f"{SUPABASE_URL}/storage/v1/object/{BUCKET}"
+TUS_URL = f"{SUPABASE_URL}/storage/v1/upload/resumable"
+TUS_THRESHOLD = 1 * 1024 * 1024  # files above this use TUS
+TUS_CHUNK_SIZE = 6 * 1024 * 1024  # Supabase requires 6 MB chunks
 HEADERS_BASE = {
     "apikey": SUPABASE_ANON_KEY,
     "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
 }
 
+# MIME types worth gzipping (GeoJSON/JSON/CSV compress 5-10x)
+COMPRESSIBLE_MIMES = {
+    "application/json",
+    "application/geo+json",
+    "application/xml",
+    "image/svg+xml",
+}
+GZIP_LEVEL = 6
+
 # ─── Progress tracking ──────────────────────────────────────────────────────
 
 def load_progress():
     if PROGRESS_FILE.exists():
-        return json.loads(PROGRESS_FILE.read_text(encoding="utf-8"))
-    return {"uploaded": {}, "failed": {}, "started_at": None}
+        progress = json.loads(PROGRESS_FILE.read_text(encoding="utf-8"))
+        progress.setdefault("resumable", {})
+        return progress
+    return {"uploaded": {}, "failed": {}, "resumable": {}, "started_at": None}
 
 def save_progress(progress):
     PROGRESS_FILE.write_text(json.dumps(progress, ensure_ascii=False, indent=2), encoding="utf-8")
@@ -75,8 +96,85 @@ def scan_files():
 
 # ─── Upload one file ────────────────────────────────────────────────────────
 
-def upload_file(file_info):
-    """Upload a single file to Supabase Storage. Returns (rel_path, success, error)"""
+def is_compressible(mime):
+    return mime.startswith("text/") or mime in COMPRESSIBLE_MIMES
+
+def gzip_file(local_path):
+    """Gzip a file into memory and return the compressed bytes."""
+    buf = io.BytesIO()
+    with open(local_path, "rb") as src, \
+            gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=GZIP_LEVEL) as gz:
+        gz.write(src.read())
+    return buf.getvalue()
+
+# ─── TUS resumable upload ───────────────────────────────────────────────────
+
+def _tus_headers(**extra):
+    return {**HEADERS_BASE, "Tus-Resumable": "1.0.0", **extra}
+
+def _b64(value):
+    return base64.b64encode(value.encode("utf-8")).decode("ascii")
+
+def tus_create(object_name, mime, size):
+    """Open a TUS upload session and return its absolute Location URL."""
+    metadata = {"bucketName": BUCKET, "objectName": object_name, "contentType": mime}
+    headers = _tus_headers(**{
+        "Upload-Length": str(size),
+        "Upload-Metadata": ",".join(f"{k} {_b64(v)}" for k, v in metadata.items()),
+        "x-upsert": "true",
+    })
+    resp = requests.post(TUS_URL, headers=headers, timeout=30)
+    if resp.status_code != 201:
+        raise RuntimeError(f"TUS create HTTP {resp.status_code}: {resp.text[:200]}")
+    return urllib.parse.urljoin(TUS_URL, resp.headers["Location"])
+
+def tus_offset(location):
+    """Return the server-acknowledged offset, or None if the session is gone."""
+    resp = requests.head(location, headers=_tus_headers(), timeout=30)
+    if resp.status_code != 200:
+        return None
+    return int(resp.headers.get("Upload-Offset", 0))
+
+def tus_upload(local_path, object_name, mime, size, location=None, on_location=None):
+    """Upload via TUS, resuming `location` if the server still knows it.
+
+    on_location(url) is called when a new session is opened so the caller
+    can persist it. Returns the session URL.
+    """
+    offset = tus_offset(location) if location else None
+    if offset is None:
+        location = tus_create(object_name, mime, size)
+        offset = 0
+        if on_location:
+            on_location(location)
+
+    with open(local_path, "rb") as f:
+        while offset < size:
+            f.seek(offset)
+            chunk = f.read(TUS_CHUNK_SIZE)
+            headers = _tus_headers(**{
+                "Upload-Offset": str(offset),
+                "Content-Type": "application/offset+octet-stream",
+            })
+            resp = requests.patch(location, headers=headers, data=chunk, timeout=120)
+            if resp.status_code != 204:
+                raise RuntimeError(f"TUS patch HTTP {resp.status_code}: {resp.text[:200]}")
+            offset = int(resp.headers.get("Upload-Offset", offset + len(chunk)))
+    return location
+
+# ─── Upload one file ────────────────────────────────────────────────────────
+
+def upload_file(file_info, gzip_text=False, on_location=None):
+    """Upload a single file to Supabase Storage. Returns (rel_path, success, error)
+
+    With gzip_text=True, text-like files are sent gzip-compressed with
+    Content-Encoding: gzip. Off by default: only enable it once the bucket
+    is confirmed to serve the header back on download.
+
+    Files over TUS_THRESHOLD use the resumable endpoint; a previous session
+    URL in file_info["tus_location"] is resumed, and new sessions are
+    reported through on_location(rel, url).
+    """
     rel = file_info["rel"]
     local_path = file_info["path"]
     
@@ -97,10 +195,31 @@ def upload_file(file_info):
     
     url = f"{STORAGE_URL}/{storage_path}"
     
+    body = None
+    if gzip_text and is_compressible(mime):
+        body = gzip_file(local_path)
+        headers["Content-Encoding"] = "gzip"
+    
+    use_tus = body is None and file_info["size"] > TUS_THRESHOLD
+    location = file_info.get("tus_location")
+    
+    def remember(url):
+        nonlocal location
+        location = url
+        if on_location:
+            on_location(rel, url)
+    
     for attempt in range(1, RETRY_MAX + 1):
         try:
-            with open(local_path, "rb") as f:
-                resp = requests.post(url, headers=headers, data=f, timeout=120)
+            if use_tus:
+                tus_upload(local_path, rel, mime, file_info["size"],
+                           location=location, on_location=remember)
+                return (rel, True, None)
+            elif body is not None:
+                resp = requests.post(url, headers=headers, data=body, timeout=120)
+            else:
+                with open(local_path, "rb") as f:
+                    resp = requests.post(url, headers=headers, data=f, timeout=120)
             
             if resp.status_code in (200, 201):
                 return (rel, True, None)
@@ -126,6 +245,7 @@ def upload_file(file_info):
 
 def main():
     reset = "--reset" in sys.argv
+    gzip_text = "--gzip" in sys.argv
     
     print("=" * 60)
     print("   Supabase Storage Uploader (Resumable)")
@@ -134,6 +254,7 @@ def main():
     print(f"  Source: {DATA_DIR}")
     print(f"  Max file size: {MAX_FILE_SIZE // (1024*1024)} MB")
     print(f"  Workers: {WORKERS}")
+    print(f"  Gzip text files: {'yes' if gzip_text else 'no'}")
     print()
     
     # Load or reset progress
@@ -142,6 +263,7 @@ def main():
         print("  Progress reset.")
     
     progress = load_progress()
+    progress_lock = threading.Lock()
     uploaded_set = set(progress.get("uploaded", {}).keys())
     
     # Scan files
@@ -154,6 +276,11 @@ def main():
     pending = [f for f in all_files if f["rel"] not in uploaded_set]
     pending_size = sum(f["size"] for f in pending)
     
+    # Resume interrupted TUS sessions
+    for f in pending:
+        if f["rel"] in progress["resumable"]:
+            f["tus_location"] = progress["resumable"][f["rel"]]
+    
     print(f"  Total files: {total_count}")
     print(f"  Already uploaded: {len(uploaded_set)}")
     print(f"  Pending: {len(pending)}")
@@ -176,44 +303,52 @@ def main():
     print(f"  Starting upload...")
     print("-" * 60)
     
+    def on_location(rel, url):
+        # Persist straight away so a crash mid-file can still resume
+        with progress_lock:
+            progress["resumable"][rel] = url
+            save_progress(progress)
+    
     with ThreadPoolExecutor(max_workers=WORKERS) as pool:
-        futures = {pool.submit(upload_file, f): f for f in pending}
+        futures = {pool.submit(upload_file, f, gzip_text, on_location): f for f in pending}
         
         for i, future in enumerate(as_completed(futures), 1):
             file_info = futures[future]
             rel, ok, error = future.result()
             
-            if ok:
-                success_count += 1
-                bytes_done += file_info["size"]
-                progress["uploaded"][rel] = {
-                    "size": file_info["size"],
-                    "at": time.strftime("%Y-%m-%d %H:%M:%S"),
-                }
-                # Remove from failed if was there
-                progress["failed"].pop(rel, None)
-            else:
-                fail_count += 1
-                progress["failed"][rel] = {
-                    "error": error,
-                    "at": time.strftime("%Y-%m-%d %H:%M:%S"),
-                }
-            
-            # Save progress every 10 files
-            if i % 10 == 0 or i == len(pending):
-                save_progress(progress)
-                elapsed = time.time() - start_time
-                rate = bytes_done / elapsed if elapsed > 0 else 0
-                eta = (total_size - bytes_done) / rate if rate > 0 else 0
-                pct = (success_count / total_count) * 100
-                print(
-                    f"  [{i}/{len(pending)}] "
-                    f"{pct:.0f}% ({success_count}/{total_count}) "
-                    f"| {bytes_done/(1024*1024):.0f}/{total_size/(1024*1024):.0f} MB "
-                    f"| {rate/(1024*1024):.1f} MB/s "
-                    f"| ETA {eta/60:.0f}m "
-                    f"| fails: {fail_count}"
-                )
+            with progress_lock:
+                if ok:
+                    success_count += 1
+                    bytes_done += file_info["size"]
+                    progress["uploaded"][rel] = {
+                        "size": file_info["size"],
+                        "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    }
+                    # Remove from failed / resumable if was there
+                    progress["failed"].pop(rel, None)
+                    progress["resumable"].pop(rel, None)
+                else:
+                    fail_count += 1
+                    progress["failed"][rel] = {
+                        "error": error,
+                        "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    }
+                
+                # Save progress every 10 files
+                if i % 10 == 0 or i == len(pending):
+                    save_progress(progress)
+                    elapsed = time.time() - start_time
+                    rate = bytes_done / elapsed if elapsed > 0 else 0
+                    eta = (total_size - bytes_done) / rate if rate > 0 else 0
+                    pct = (success_count / total_count) * 100
+                    print(
+                        f"  [{i}/{len(pending)}] "
+                        f"{pct:.0f}% ({success_count}/{total_count}) "
+                        f"| {bytes_done/(1024*1024):.0f}/{total_size/(1024*1024):.0f} MB "
+                        f"| {rate/(1024*1024):.1f} MB/s "
+                        f"| ETA {eta/60:.0f}m "
+                        f"| fails: {fail_count}"
+                    )
     
     # Final save
     progress["last_run"] = time.strftime("%Y-%m-%d %H:%M:%S")
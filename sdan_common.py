@@ -9,27 +9,34 @@ Contains:
   • Document-link extraction from modals
   • SQLite database helpers
   • The core ``process_gush`` function used by all category scripts
+  • ``run_all`` – process many gushim in parallel worker processes
 """
 
 import os
 import re
-import time
+import shutil
 import json
 import sqlite3
-from typing import List, Tuple, Dict, Optional
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Callable, Iterable, List, Tuple, Dict, Optional
 from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
+    WebDriverException,
     TimeoutException,
     NoSuchElementException,
     ElementClickInterceptedException,
-    StaleElementReferenceException,
 )
 from webdriver_manager.chrome import ChromeDriverManager
 
@@ -41,6 +48,15 @@ KFAR_CHABAD_GUSHIM = [
 
 HELKA_RANGE = range(1, 201)  # 1–200
 
+DOWNLOAD_WORKERS = 8  # parallel file downloads per (gush, helka) pair
+GUSH_WORKERS = 3  # default gush threads of run_all / download_plans / download_permits
+
+# Complot XPA endpoint behind sdan.complot.co.il/gush2 – answers a plain
+# GET per parcel, far cheaper than a Selenium search
+XPA_API = "https://handasi.complot.co.il/magicscripts/mgrqispi.dll"
+SDAN_SITE_ID = 31
+_XPA_NOT_FOUND = ("מצטערים", "לא ניתן להציג", "לא אותרו תוצאות")
+
 # ─── Category-specific selectors ─────────────────────────────────────────────
 SELECTORS: Dict[str, Dict[str, str]] = {
     "plans": {
@@ -61,45 +77,298 @@ SELECTORS: Dict[str, Dict[str, str]] = {
 
 
 # ─── Chrome driver factory ───────────────────────────────────────────────────
-def create_driver(headless: bool = False) -> webdriver.Chrome:
-    """Create a Chrome WebDriver with anti-detection flags."""
+# Resources the scraper never reads – blocked to cut bytes per page load.
+# Stylesheets stay enabled: modal visibility waits depend on them.
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif",
+    "*.woff", "*.woff2", "*.ttf",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*",
+    "*facebook*",
+]
+
+_HIDE_BANNER_JS = """
+document.addEventListener('DOMContentLoaded', function () {
+    var b = document.getElementById('cap-banner');
+    if (b) b.style.display = 'none';
+});
+"""
+
+_DRIVER_PATH: Optional[str] = None
+_DRIVER_PATH_LOCK = threading.Lock()
+
+
+def get_driver_path() -> str:
+    """Resolve the chromedriver binary once per process.
+
+    Honors the ``CHROMEDRIVER`` env var; otherwise asks webdriver-manager
+    on first use and caches the result for every later driver.
+    """
+    global _DRIVER_PATH
+    if _DRIVER_PATH is None:
+        with _DRIVER_PATH_LOCK:
+            if _DRIVER_PATH is None:
+                _DRIVER_PATH = (
+                    os.environ.get("CHROMEDRIVER")
+                    or ChromeDriverManager().install()
+                )
+    return _DRIVER_PATH
+
+
+def create_driver(headless: bool = True) -> webdriver.Chrome:
+    """Create a Chrome WebDriver with anti-detection flags.
+
+    Tuned for scraping: no images/fonts, no GPU/extensions, and ``eager``
+    page loads that return at DOMContentLoaded.
+    """
     opts = webdriver.ChromeOptions()
     opts.add_argument("--disable-blink-features=AutomationControlled")
     opts.add_experimental_option("excludeSwitches", ["enable-automation"])
     opts.add_experimental_option("useAutomationExtension", False)
+    opts.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.fonts": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    opts.add_argument("--blink-settings=imagesEnabled=false")
+    opts.add_argument("--disable-gpu")
+    opts.add_argument("--disable-dev-shm-usage")
+    opts.add_argument("--disable-extensions")
+    opts.page_load_strategy = "eager"
     if headless:
         opts.add_argument("--headless=new")
     driver = webdriver.Chrome(
-        service=Service(ChromeDriverManager().install()), options=opts
+        service=Service(get_driver_path()), options=opts
     )
     driver.execute_script(
         "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
     )
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    # Hide the cookie banner on every page this driver loads
+    driver.execute_cdp_cmd(
+        "Page.addScriptToEvaluateOnNewDocument", {"source": _HIDE_BANNER_JS}
+    )
     return driver
 
 
+# One reusable driver per worker thread (drivers are not thread-safe)
+_SHARED = threading.local()
+_SHARED_DRIVERS: List[webdriver.Chrome] = []
+_SHARED_DRIVERS_LOCK = threading.Lock()
+
+
+def get_shared_driver(headless: bool = True) -> webdriver.Chrome:
+    """Return this thread's reusable driver, creating it on first use."""
+    driver = getattr(_SHARED, "driver", None)
+    if driver is None:
+        driver = create_driver(headless)
+        _SHARED.driver = driver
+        with _SHARED_DRIVERS_LOCK:
+            _SHARED_DRIVERS.append(driver)
+    return driver
+
+
+def discard_shared_driver() -> None:
+    """Quit this thread's shared driver so the next call starts fresh."""
+    driver = getattr(_SHARED, "driver", None)
+    if driver is None:
+        return
+    _SHARED.driver = None
+    with _SHARED_DRIVERS_LOCK:
+        if driver in _SHARED_DRIVERS:
+            _SHARED_DRIVERS.remove(driver)
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+
+def quit_shared_drivers() -> None:
+    """Quit every driver handed out by :func:`get_shared_driver`."""
+    with _SHARED_DRIVERS_LOCK:
+        drivers = list(_SHARED_DRIVERS)
+        _SHARED_DRIVERS.clear()
+    for driver in drivers:
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
 # ─── File helpers ─────────────────────────────────────────────────────────────
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
+_SANITIZE_RE = re.compile(r'[\\/:*?"<>|\n\r]')
+_PAREN_ID_RE = re.compile(r'\((\d+)\)')
+
+
 def sanitize(name: str) -> str:
     """Remove invalid filename characters."""
-    name = re.sub(r'[\\/:*?"<>|\n\r]', '_', name)
-    return name.strip('. ') or "document"
+    return _SANITIZE_RE.sub('_', name).strip('. ') or "document"
 
 
+@lru_cache(maxsize=4096)
 def file_ext(url: str, default: str = ".pdf") -> str:
     _, ext = os.path.splitext(urlparse(url).path)
     return ext.lower() if ext else default
 
 
-def download_file(url: str, dest: str) -> None:
-    r = requests.get(url, stream=True, timeout=60)
+# Shared HTTP session: keep-alive connections are reused across downloads
+_SESSION = requests.Session()
+
+
+def size_http_pool(gush_workers: int = GUSH_WORKERS) -> None:
+    """Size the shared session's connection pool for *gush_workers* threads.
+
+    Each gush thread runs one pair at a time: up to DOWNLOAD_WORKERS
+    downloads plus its own probe/HEAD requests. Call before starting the
+    gush pool.
+    """
+    size = max(1, gush_workers) * (DOWNLOAD_WORKERS + 1)
+    adapter = HTTPAdapter(
+        pool_connections=size, pool_maxsize=size,
+        max_retries=Retry(
+            total=3, backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+        ),
+    )
+    _SESSION.mount("http://", adapter)
+    _SESSION.mount("https://", adapter)
+
+
+size_http_pool()
+
+
+DOWNLOAD_BUFFER = 1024 * 1024  # 1 MiB copy buffer
+
+
+def download_file(url: str, dest: str) -> int:
+    """Stream *url* to *dest* and return the number of bytes written.
+
+    The body goes to a ``.part`` file named after this process and thread
+    and is renamed into place when complete, so parallel workers (threads
+    or processes) never write the same path and *dest* is never left
+    half-written.
+    """
+    r = _SESSION.get(url, stream=True, timeout=60)
     r.raise_for_status()
-    with open(dest, "wb") as f:
-        for chunk in r.iter_content(8192):
-            f.write(chunk)
+    r.raw.decode_content = True
+    tmp = f"{dest}.{os.getpid()}.{threading.get_ident()}.part"
+    try:
+        with open(tmp, "wb") as f:
+            shutil.copyfileobj(r.raw, f, length=DOWNLOAD_BUFFER)
+            size = f.tell()
+            if hasattr(os, "posix_fadvise"):
+                # Archived PDFs are not re-read – hint the kernel to keep them
+                # out of the page cache. Advisory only: pages still dirty are
+                # skipped (no fsync here, to keep downloads non-blocking)
+                f.flush()
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return size
+
+
+def remove_stale_parts(download_root: str, category: str, gush: int) -> int:
+    """Delete ``.part`` files a killed run left under *gush*'s pair folders.
+
+    Only this gush's folders are touched, so downloads of other gushim in
+    flight on other threads keep their temp files. Returns the count removed.
+    """
+    removed = 0
+    cat_dir = os.path.join(download_root, category)
+    if not os.path.isdir(cat_dir):
+        return 0
+    stack = [
+        e.path for e in os.scandir(cat_dir)
+        if e.is_dir() and e.name.startswith(f"{gush}_")
+    ]
+    while stack:
+        for e in os.scandir(stack.pop()):
+            if e.is_dir(follow_symlinks=False):
+                stack.append(e.path)
+            elif e.name.endswith(".part"):
+                os.remove(e.path)
+                removed += 1
+    return removed
+
+
+def remote_unchanged(
+    url: str, local_size: int, etag: Optional[str] = None
+) -> Tuple[bool, str, int]:
+    """HEAD *url* and check whether a local copy of *local_size* bytes is whole.
+
+    Sends ``If-None-Match`` when an ETag is known. A server that reports no
+    usable Content-Length (none, or one for an encoded body) is trusted, as
+    before this check existed. If the HEAD itself fails – some servers
+    reject it – the answer is "not known unchanged" and the caller GETs.
+    Returns ``(unchanged, etag, content_length)``.
+    """
+    headers = {"If-None-Match": etag} if etag else {}
+    try:
+        r = _SESSION.head(url, headers=headers, timeout=15, allow_redirects=True)
+    except requests.RequestException:
+        return False, etag or "", 0
+    if r.status_code == 304:
+        return True, etag or "", local_size
+    if not 200 <= r.status_code < 300:
+        return False, etag or "", 0
+    etag = r.headers.get("ETag", "")
+    if r.headers.get("Content-Encoding", "identity") != "identity":
+        return True, etag, 0  # length of the encoded body, not the file
+    length = int(r.headers.get("Content-Length") or 0)
+    return (length == 0 or length == local_size), etag, length
+
+
+def fetch_document(
+    url: str, dest: str, local_size: Optional[int] = None, etag: Optional[str] = None
+) -> Tuple[bool, str, int, int]:
+    """Download *url* to *dest* unless an existing copy is already complete.
+
+    A partial file left by an interrupted run is detected by size and
+    fetched again. Returns ``(downloaded, etag, content_length, local_size)``.
+    """
+    length = 0
+    if local_size is not None:
+        unchanged, etag, length = remote_unchanged(url, local_size, etag)
+        if unchanged:
+            return False, etag, length or local_size, local_size
+    size = download_file(url, dest)
+    return True, etag or "", length or size, size
+
+
+def parcel_exists(gush: int, helka: int) -> Optional[bool]:
+    """Ask Complot's XPA ``GetGushFile`` whether a parcel is on record.
+
+    Returns False only on an explicit "not found" answer; None when the
+    endpoint errors or the reply is inconclusive, so callers fall back to
+    the Selenium search.
+    """
+    params = {
+        "appname": "cixpa",
+        "prgname": "GetGushFile",
+        "siteid": SDAN_SITE_ID,
+        "g": gush,
+        "h": helka,
+        "arguments": "siteid,g,h",
+    }
+    try:
+        r = _SESSION.get(
+            XPA_API, params=params, timeout=10,
+            headers={"Referer": "https://sdan.complot.co.il/gush2/"},
+        )
+    except requests.RequestException:
+        return None
+    if r.status_code != 200 or len(r.text) < 100:
+        return None
+    if any(marker in r.text for marker in _XPA_NOT_FOUND):
+        return False
+    return True
 
 
 # ─── Selenium helpers ────────────────────────────────────────────────────────
@@ -111,7 +380,11 @@ def safe_click(driver: webdriver.Chrome, el) -> None:
 
 
 def dismiss_banner(driver: webdriver.Chrome) -> None:
-    """Hide the cookie-consent banner if present."""
+    """Hide the cookie-consent banner if present.
+
+    Drivers from :func:`create_driver` already hide it on load; this is
+    for drivers created elsewhere.
+    """
     try:
         banner = driver.find_element(By.ID, "cap-banner")
         if banner.is_displayed():
@@ -125,7 +398,6 @@ def dismiss_banner(driver: webdriver.Chrome) -> None:
                 for b in btns:
                     if b.is_displayed():
                         b.click()
-                        time.sleep(0.5)
                         return
             driver.execute_script(
                 "document.getElementById('cap-banner').style.display='none';"
@@ -134,29 +406,24 @@ def dismiss_banner(driver: webdriver.Chrome) -> None:
         pass
 
 
+# Same fallback chain as before, evaluated in the browser in one call
+_DOC_LINKS_JS = """
+var mc = document.getElementById('modalcontent');
+if (!mc) return [];
+var anchors = mc.querySelectorAll('table#tblGrid tbody tr td:first-child a');
+if (!anchors.length) anchors = mc.querySelectorAll("a[href*='archive.gis-net.co.il']");
+if (!anchors.length) anchors = mc.querySelectorAll("a[target='_blank']");
+return Array.from(anchors).map(function (a) { return [a.innerText, a.href]; });
+"""
+
+
 def extract_doc_links(driver: webdriver.Chrome) -> List[Tuple[str, str]]:
     """Return [(title, url), …] from the currently open modal."""
     links: List[Tuple[str, str]] = []
-    try:
-        mc = driver.find_element(By.ID, "modalcontent")
-    except NoSuchElementException:
-        return links
-
-    anchors = mc.find_elements(
-        By.CSS_SELECTOR, "table#tblGrid tbody tr td:first-child a"
-    )
-    if not anchors:
-        anchors = mc.find_elements(
-            By.CSS_SELECTOR, "a[href*='archive.gis-net.co.il']"
-        )
-    if not anchors:
-        anchors = mc.find_elements(By.CSS_SELECTOR, "a[target='_blank']")
-
-    for a in anchors:
-        url = a.get_attribute("href")
+    for text, url in driver.execute_script(_DOC_LINKS_JS) or []:
         if not url or url.startswith("javascript"):
             continue
-        title = a.text.replace("נפתח בחלון חדש", "").strip() or "document"
+        title = (text or "").replace("נפתח בחלון חדש", "").strip() or "document"
         links.append((title, url))
     return links
 
@@ -183,13 +450,40 @@ def close_modal(driver: webdriver.Chrome) -> None:
         )
     except TimeoutException:
         pass
-    time.sleep(0.5)
 
 
 # ─── Database ────────────────────────────────────────────────────────────────
+# Kept as a constant so sqlite3's per-connection statement cache reuses it
+_INSERT_DOC_SQL = (
+    "INSERT OR IGNORE INTO documents "
+    "(gush, helka, plan_number, title, file_path, file_name, "
+    "file_size, file_type, category, is_tashrit, is_georef) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)"
+)
+
+# Title keywords that mark a document as a tashrit (plan drawing)
+_TASHRIT_MARKERS = ("תשריט",)
+
+
+# Last table created by open_db's schema script: once it exists, the whole
+# script has run and later connections can skip it. Keep it last.
+_SCHEMA_SENTINEL = "sdan_scans"
+
+
 def open_db(path: str = "kfar_chabad_documents.db") -> sqlite3.Connection:
-    conn = sqlite3.connect(path, check_same_thread=False)
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
     conn.execute("PRAGMA foreign_keys=ON")
+    # Bulk-insert friendly settings: WAL journal, one fsync per checkpoint
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped reads
+    if conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+        (_SCHEMA_SENTINEL,),
+    ).fetchone():
+        return conn
     # Ensure new normalized schema exists (safe if tables already present)
     conn.executescript("""
         CREATE TABLE IF NOT EXISTS gushim (
@@ -303,123 +597,277 @@ def open_db(path: str = "kfar_chabad_documents.db") -> sqlite3.Connection:
         CREATE INDEX IF NOT EXISTS idx_plan_details_gush ON plan_details(gush);
         CREATE INDEX IF NOT EXISTS idx_permit_details_gush ON permit_details(gush);
         CREATE INDEX IF NOT EXISTS idx_permit_details_applicant ON permit_details(applicant_name);
+
+        -- Remote size/ETag of downloaded files, to skip re-checks on re-runs
+        CREATE TABLE IF NOT EXISTS download_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            content_length INTEGER,
+            local_size INTEGER,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Helkot whose SDAN search returned results, per category, and the
+        -- (gush, category) pairs whose full HELKA_RANGE pass has completed
+        CREATE TABLE IF NOT EXISTS sdan_hits (
+            gush INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            helka INTEGER NOT NULL,
+            PRIMARY KEY (gush, category, helka)
+        );
+        CREATE TABLE IF NOT EXISTS sdan_scans (
+            gush INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (gush, category)
+        );
     """)
     conn.commit()
     return conn
 
 
+def open_db_readonly(path: str = "kfar_chabad_documents.db") -> sqlite3.Connection:
+    """Open a read-only lookup connection next to :func:`open_db`'s writer.
+
+    Under WAL the reader and the writer never block each other. *path* must
+    already exist (open it with :func:`open_db` first).
+    """
+    uri = Path(path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=256)
+    conn.execute("PRAGMA query_only=1")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+
+def load_download_cache(
+    conn: sqlite3.Connection, urls: List[str]
+) -> Dict[str, Tuple[str, int, int]]:
+    """Return ``{url: (etag, content_length, local_size)}`` for known *urls*."""
+    if not urls:
+        return {}
+    placeholders = ",".join("?" * len(urls))
+    return {
+        url: (etag, length, size)
+        for url, etag, length, size in conn.execute(
+            "SELECT url, etag, content_length, local_size FROM download_cache "
+            f"WHERE url IN ({placeholders})",
+            urls,
+        )
+    }
+
+
+def save_download_cache(
+    conn: sqlite3.Connection, rows: List[Tuple[str, str, int, int]]
+) -> None:
+    """Record ``(url, etag, content_length, local_size)`` checks. No commit."""
+    if rows:
+        conn.executemany(
+            "INSERT INTO download_cache (url, etag, content_length, local_size) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET etag=excluded.etag, "
+            "content_length=excluded.content_length, "
+            "local_size=excluded.local_size, checked_at=CURRENT_TIMESTAMP",
+            rows,
+        )
+
+
 # ─── Metadata extraction from result rows ───────────────────────────────────
-def extract_plan_metadata(row, gush: int, helka: int) -> Dict:
-    """Extract all metadata columns from a plans result row.
+_RESULT_ROWS = "table#results-table tbody tr[role='row']"
+
+# Snapshot every result row (cell texts, source link, plan-number link and
+# whether it has an archive button) in one round-trip
+_ROWS_META_JS = """
+var rows = document.querySelectorAll(arguments[0]);
+return Array.from(rows).map(function (r) {
+    var c = r.querySelectorAll('td');
+    var a = c.length ? c[0].querySelector("a[href^='javascript:get']") : null;
+    var links = r.querySelectorAll("td a[href^='javascript:get']");
+    return {
+        cells: Array.from(c).map(function (x) { return x.innerText.trim(); }),
+        href: a ? a.href : '',
+        plan: links.length > 1 ? links[1].innerText.trim() : '',
+        has_btn: !!r.querySelector('button.openBtn')
+    };
+});
+"""
+
+# Click the archive button of the row at arguments[1]
+_CLICK_ARCHIVE_JS = """
+var row = document.querySelectorAll(arguments[0])[arguments[1]];
+var btn = row && row.querySelector('button.openBtn');
+if (!btn) return false;
+btn.click();
+return true;
+"""
+
+
+def _source_id(href: str) -> str:
+    m = _PAREN_ID_RE.search(href or "")
+    return m.group(1) if m else ""
+
+
+def extract_plan_metadata(cells: List[str], href: str, gush: int, helka: int) -> Dict:
+    """Build the metadata dict for a plans result row.
 
     Plans table columns:
       [0] icon-link, [1] plan_number, [2] plan_name,
       [3] status, [4] status_date, [5] archive_button
     """
-    cells = row.find_elements(By.TAG_NAME, "td")
     if len(cells) < 5:
         return {}
-    source_id = ""
-    try:
-        link = cells[0].find_element(By.CSS_SELECTOR, "a[href^='javascript:get']")
-        href = link.get_attribute("href") or ""
-        m = re.search(r'\((\d+)\)', href)
-        if m:
-            source_id = m.group(1)
-    except NoSuchElementException:
-        pass
     return {
-        "plan_number": cells[1].text.strip(),
-        "plan_name": cells[2].text.strip(),
-        "status": cells[3].text.strip(),
-        "status_date": cells[4].text.strip(),
-        "source_id": source_id,
+        "plan_number": cells[1],
+        "plan_name": cells[2],
+        "status": cells[3],
+        "status_date": cells[4],
+        "source_id": _source_id(href),
         "gush": gush,
         "helka": helka,
     }
 
 
-def extract_permit_metadata(row, gush: int, helka: int) -> Dict:
-    """Extract all metadata columns from a permits result row.
+def extract_permit_metadata(cells: List[str], href: str, gush: int, helka: int) -> Dict:
+    """Build the metadata dict for a permits result row.
 
     Permits table columns:
       [0] icon-link, [1] request_number, [2] building_file,
       [3] submission_date, [4] applicant_name, [5] address,
       [6] gush, [7] helka, [8] archive_button
     """
-    cells = row.find_elements(By.TAG_NAME, "td")
     if len(cells) < 8:
         return {}
-    source_id = ""
-    try:
-        link = cells[0].find_element(By.CSS_SELECTOR, "a[href^='javascript:get']")
-        href = link.get_attribute("href") or ""
-        m = re.search(r'\((\d+)\)', href)
-        if m:
-            source_id = m.group(1)
-    except NoSuchElementException:
-        pass
     return {
-        "request_number": cells[1].text.strip(),
-        "building_file": cells[2].text.strip(),
-        "submission_date": cells[3].text.strip(),
-        "applicant_name": cells[4].text.strip(),
-        "address": cells[5].text.strip(),
+        "request_number": cells[1],
+        "building_file": cells[2],
+        "submission_date": cells[3],
+        "applicant_name": cells[4],
+        "address": cells[5],
         "gush": gush,
         "helka": helka,
-        "source_id": source_id,
+        "source_id": _source_id(href),
     }
 
 
-def _save_row_metadata(conn: sqlite3.Connection, meta: Dict, category: str) -> None:
-    """Insert / update metadata into the appropriate detail table."""
-    if not meta:
+def snapshot_result_rows(driver: webdriver.Chrome) -> List[Dict]:
+    """Return a plain-data description of every result row (one JS call)."""
+    return driver.execute_script(_ROWS_META_JS, _RESULT_ROWS) or []
+
+
+def extract_all_rows_meta_js(
+    driver: webdriver.Chrome, category: str, gush: int, helka: int,
+    rows: Optional[List[Dict]] = None,
+) -> List[Dict]:
+    """Return metadata for every result row using a single JS evaluation.
+
+    Pass *rows* from :func:`snapshot_result_rows` to reuse a snapshot.
+    """
+    extract = extract_plan_metadata if category == "plans" else extract_permit_metadata
+    if rows is None:
+        rows = snapshot_result_rows(driver)
+    return [extract(r["cells"], r["href"], gush, helka) for r in rows]
+
+
+def _save_rows_metadata(
+    conn: sqlite3.Connection, metas: List[Dict], category: str
+) -> None:
+    """Upsert a results page's metadata into the appropriate detail table.
+
+    All rows go through one ``executemany`` per statement. Does not
+    commit – the caller owns the transaction.
+    """
+    metas = [m for m in metas if m]
+    if not metas:
         return
     if category == "plans":
-        conn.execute(
-            "INSERT OR REPLACE INTO plan_details "
+        conn.executemany(
+            "INSERT INTO plan_details "
             "(plan_number, plan_name, status, status_date, gush, helka, source_id) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (
-                meta.get("plan_number", ""),
-                meta.get("plan_name", ""),
-                meta.get("status", ""),
-                meta.get("status_date", ""),
-                meta.get("gush"),
-                meta.get("helka"),
-                meta.get("source_id", ""),
-            ),
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(plan_number, gush, helka) DO UPDATE SET "
+            "plan_name=excluded.plan_name, status=excluded.status, "
+            "status_date=excluded.status_date, source_id=excluded.source_id",
+            [
+                (
+                    meta.get("plan_number", ""),
+                    meta.get("plan_name", ""),
+                    meta.get("status", ""),
+                    meta.get("status_date", ""),
+                    meta.get("gush"),
+                    meta.get("helka"),
+                    meta.get("source_id", ""),
+                )
+                for meta in metas
+            ],
         )
         # Also update the plans table with name and status
-        pnum = meta.get("plan_number", "")
-        if pnum:
-            conn.execute(
-                "INSERT OR IGNORE INTO plans (plan_number) VALUES (?)", (pnum,)
-            )
-            conn.execute(
-                "UPDATE plans SET plan_name=?, status=?, plan_type=? "
-                "WHERE plan_number=?",
-                (meta.get("plan_name", ""), meta.get("status", ""),
-                 meta.get("status", ""), pnum),
-            )
+        conn.executemany(
+            "INSERT INTO plans (plan_number, plan_name, status, plan_type) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(plan_number) DO UPDATE SET "
+            "plan_name=excluded.plan_name, status=excluded.status, "
+            "plan_type=excluded.plan_type",
+            [
+                (meta["plan_number"], meta.get("plan_name", ""),
+                 meta.get("status", ""), meta.get("status", ""))
+                for meta in metas
+                if meta.get("plan_number")
+            ],
+        )
     elif category == "permits":
-        conn.execute(
-            "INSERT OR REPLACE INTO permit_details "
+        conn.executemany(
+            "INSERT INTO permit_details "
             "(request_number, building_file, submission_date, "
             "applicant_name, address, gush, helka, source_id) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                meta.get("request_number", ""),
-                meta.get("building_file", ""),
-                meta.get("submission_date", ""),
-                meta.get("applicant_name", ""),
-                meta.get("address", ""),
-                meta.get("gush"),
-                meta.get("helka"),
-                meta.get("source_id", ""),
-            ),
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(request_number, gush, helka) DO UPDATE SET "
+            "building_file=excluded.building_file, "
+            "submission_date=excluded.submission_date, "
+            "applicant_name=excluded.applicant_name, "
+            "address=excluded.address, source_id=excluded.source_id",
+            [
+                (
+                    meta.get("request_number", ""),
+                    meta.get("building_file", ""),
+                    meta.get("submission_date", ""),
+                    meta.get("applicant_name", ""),
+                    meta.get("address", ""),
+                    meta.get("gush"),
+                    meta.get("helka"),
+                    meta.get("source_id", ""),
+                )
+                for meta in metas
+            ],
         )
-    conn.commit()
+
+
+def known_helkot(
+    conn: sqlite3.Connection,
+    gush: int,
+    category: str,
+    helka_range: Iterable[int] = HELKA_RANGE,
+) -> Iterable[int]:
+    """Helkot of *gush* that had *category* results, or all of *helka_range*.
+
+    The short list from ``sdan_hits`` is only trusted once a full
+    HELKA_RANGE pass for this gush and category has completed (recorded in
+    ``sdan_scans``); until then – cold DB, interrupted run – the whole
+    range is searched again.
+    """
+    if not conn.execute(
+        "SELECT 1 FROM sdan_scans WHERE gush = ? AND category = ?",
+        (gush, category),
+    ).fetchone():
+        return helka_range
+    allowed = set(helka_range)
+    return [
+        h for (h,) in conn.execute(
+            "SELECT helka FROM sdan_hits WHERE gush = ? AND category = ? "
+            "ORDER BY helka",
+            (gush, category),
+        )
+        if h in allowed
+    ]
 
 
 # ─── Core download logic for one gush ───────────────────────────────────────
@@ -430,37 +878,148 @@ def process_gush(
     db_path: str = "kfar_chabad_documents.db",
     helka_range: range = HELKA_RANGE,
     timeout: int = 20,
+    helka_hint_fn: Optional[Callable[[int], Iterable[int]]] = None,
+    driver: Optional[webdriver.Chrome] = None,
+    probe_parcels: bool = False,
 ) -> Dict[str, int]:
     """Download all documents for one *gush* in one *category*.
 
-    Creates its own Chrome driver and DB connection.
+    Opens its own DB connection. Uses *driver* if given (left running),
+    otherwise creates a Chrome driver and quits it when done.
+    Helkot to search come from *helka_hint_fn(gush)* when given, otherwise
+    from :func:`known_helkot`; a completed pass over the full HELKA_RANGE
+    is recorded so later runs take the short list. With *probe_parcels*,
+    a full-range pass first checks each helka with :func:`parcel_exists`
+    and skips parcels the GIS registry reports as missing (note: this also
+    drops historic/merged helkot that may still have SDAN records).
     Returns a summary dict: {"gush": …, "files": …, "errors": …}.
     """
     sel = SELECTORS[category]
     base_url = sel["url"]
 
-    driver = create_driver()
+    own_driver = driver is None
+    if own_driver:
+        driver = create_driver()
+    else:
+        driver.delete_all_cookies()  # start each gush with a clean session
     conn = open_db(db_path)
+    reader = open_db_readonly(db_path)  # SELECTs; *conn* only writes
     stats = {"gush": gush, "category": category, "files": 0, "errors": 0}
 
     try:
-        for helka in helka_range:
-            _process_one_pair(
-                driver, gush, helka, sel, base_url,
-                download_root, conn, category, timeout, stats,
+        # Ensure the gush row exists – once per gush, not per document
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO gushim (gush, name) VALUES (?, ?)",
+                (gush, f"גוש {gush}"),
+            )
+
+        remove_stale_parts(download_root, category, gush)
+
+        if helka_hint_fn is not None:
+            helkot = helka_hint_fn(gush)
+        else:
+            helkot = known_helkot(reader, gush, category, helka_range)
+        full_pass = helkot is helka_range and helka_range == HELKA_RANGE
+        # A short list is already known to have results – don't re-probe it
+        probe = probe_parcels and helkot is helka_range
+
+        # Documents already recorded for this gush – one query up front
+        # instead of a filesystem check per file
+        already = {
+            path for (path,) in reader.execute(
+                "SELECT file_path FROM documents WHERE gush = ?", (gush,)
             )
+        }
+
+        # Load the search page once; each helka refills the same form
+        _open_search_form(driver, sel, base_url, timeout)
+        for helka in helkot:
+            if probe and parcel_exists(gush, helka) is False:
+                # The registry misses historic/merged parcels, so a skipped
+                # helka was never really searched – don't cache the short list
+                full_pass = False
+                continue
+            # One transaction per pair: a single commit instead of one per row.
+            # Committed in `finally` so a failed pair keeps its finished rows.
+            try:
+                outcome = _search_one_helka(
+                    driver, gush, helka, sel, base_url,
+                    download_root, conn, category, timeout, stats, already,
+                    reader,
+                )
+            finally:
+                conn.commit()
+            if outcome == "failed":
+                full_pass = False  # unsearched helka – keep the full range
+
+        if full_pass:
+            # Every helka came back rows/empty: later runs may trust sdan_hits
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sdan_scans (gush, category) VALUES (?, ?)",
+                    (gush, category),
+                )
     finally:
-        driver.quit()
+        if own_driver:
+            driver.quit()
+        reader.close()
         conn.close()
 
     return stats
 
 
-def _process_one_pair(
-    driver, gush, helka, sel, base_url,
-    download_root, conn, category, timeout, stats,
-):
-    """Search one (gush, helka) pair and download any documents found."""
+def process_gush_shared(gush: int, category: str, download_root: str, **kwargs) -> Dict[str, int]:
+    """:func:`process_gush` on the calling thread's shared driver.
+
+    Saves a Chrome cold start per gush when a worker thread handles several
+    gushim. A driver that fails is discarded so the next gush gets a new one.
+    Call :func:`quit_shared_drivers` once all work is done.
+    """
+    try:
+        return process_gush(
+            gush, category, download_root, driver=get_shared_driver(), **kwargs
+        )
+    except WebDriverException:
+        discard_shared_driver()
+        raise
+
+
+def run_all(
+    gushim: Iterable[int],
+    category: str,
+    download_root: str,
+    db_path: str = "kfar_chabad_documents.db",
+    max_workers: int = 4,
+) -> List[Dict[str, int]]:
+    """Run :func:`process_gush` for every gush in a process pool.
+
+    Each worker gets its own Chrome instance and SQLite connection (WAL
+    lets them write concurrently). Returns the per-gush stats dicts.
+    """
+    gushim = list(gushim)
+    results: List[Dict[str, int]] = []
+    with ProcessPoolExecutor(max_workers=max(1, min(max_workers, len(gushim)))) as pool:
+        futures = {
+            pool.submit(process_gush, g, category, download_root, db_path): g
+            for g in gushim
+        }
+        for future in as_completed(futures):
+            gush = futures[future]
+            try:
+                stats = future.result()
+            except Exception as e:
+                print(f"  [{category}] gush={gush} failed: {e}")
+                stats = {"gush": gush, "category": category, "files": 0, "errors": 1}
+            else:
+                print(f"  [{category}] gush={gush} done: "
+                      f"{stats['files']} file(s), {stats['errors']} error(s)")
+            results.append(stats)
+    return results
+
+
+def _open_search_form(driver, sel, base_url, timeout) -> bool:
+    """Load the search page and switch it to gush/helka search mode."""
     driver.get(base_url)
 
     try:
@@ -468,67 +1027,122 @@ def _process_one_pair(
             EC.presence_of_element_located((By.CSS_SELECTOR, "div.form-horizontal"))
         )
     except TimeoutException:
-        return
-
-    dismiss_banner(driver)
+        return False
 
     # Click "גוש וחלקה" radio
     try:
         safe_click(driver, driver.find_element(By.ID, sel["radio_label_id"]))
-        time.sleep(0.3)
     except NoSuchElementException:
-        return
-
-    # Fill gush
+        return False
+    # The gush/helka inputs are enabled once the radio has taken effect
     try:
-        gi = driver.find_element(By.ID, sel["gush_input_id"])
-        gi.clear(); gi.send_keys(str(gush))
-    except NoSuchElementException:
-        return
+        WebDriverWait(driver, 3).until(
+            lambda d: d.find_element(By.ID, sel["gush_input_id"]).is_enabled()
+        )
+    except TimeoutException:
+        pass
+    return True
+
+
+_SUBMIT_SEARCH_JS = """
+var gi = document.getElementById(arguments[0]);
+var hi = document.getElementById(arguments[1]);
+var btn = document.getElementById(arguments[2]);
+if (!gi || !hi || !btn) return false;
+[[gi, arguments[3]], [hi, arguments[4]]].forEach(function (p) {
+    p[0].value = p[1];
+    p[0].dispatchEvent(new Event('input', {bubbles: true}));
+    p[0].dispatchEvent(new Event('change', {bubbles: true}));
+});
+// Drop the previous helka's rows and hide its "no results" marker so the
+// results wait can't match either
+var t = document.querySelector('table#results-table tbody');
+if (t) t.innerHTML = '';
+document.querySelectorAll('#no-results, .no-data').forEach(function (m) {
+    m.style.display = 'none';
+});
+btn.click();
+return true;
+"""
 
-    # Fill helka
-    try:
-        hi = driver.find_element(By.ID, sel["helka_input_id"])
-        hi.clear(); hi.send_keys(str(helka))
-    except NoSuchElementException:
-        return
 
-    # Click "הצג"
-    try:
-        safe_click(driver, driver.find_element(By.ID, sel["show_button_id"]))
-    except NoSuchElementException:
-        return
+# "rows" / "empty" once the search has rendered, null while still pending
+_RESULTS_STATE_JS = """
+var table = document.querySelector('table#results-table');
+if (table && table.querySelector("tbody tr[role='row']")
+        && !table.querySelector('td.dataTables_empty')) return 'rows';
+if (table && table.querySelector('td.dataTables_empty')) return 'empty';
+// Only a visible marker counts – a hidden one is left over from the last search
+var markers = document.querySelectorAll('#no-results, .no-data');
+for (var i = 0; i < markers.length; i++) {
+    if (markers[i].offsetParent !== null) return 'empty';
+}
+return null;
+"""
 
-    # Wait for results
+
+def _submit_search(driver, sel, gush, helka) -> bool:
+    """Fill gush + helka in the already-open form and click "הצג".
+
+    Done in a single ``execute_script`` round-trip instead of separate
+    find/clear/send_keys/click WebDriver commands.
+    """
+    return bool(driver.execute_script(
+        _SUBMIT_SEARCH_JS,
+        sel["gush_input_id"], sel["helka_input_id"], sel["show_button_id"],
+        str(gush), str(helka),
+    ))
+
+
+def _search_one_helka(
+    driver, gush, helka, sel, base_url,
+    download_root, conn, category, timeout, stats, already=frozenset(),
+    reader=None,
+):
+    """Search one (gush, helka) pair and download any documents found.
+
+    Returns ``"rows"``, ``"empty"`` (the search rendered no results) or
+    ``"failed"`` (form missing or the results never rendered).
+
+    *already* holds ``documents.file_path`` values recorded on earlier runs;
+    those files are skipped when still on disk. Lookups go through *reader*
+    (default: *conn*).
+    """
+    reader = reader or conn
+    if not _submit_search(driver, sel, gush, helka):
+        # Form missing (first call failed or the page navigated) – reload once
+        if not (_open_search_form(driver, sel, base_url, timeout)
+                and _submit_search(driver, sel, gush, helka)):
+            return "failed"
+
+    # Wait for results – or for the table's "no data" marker, so empty
+    # helkot return as soon as the search completes instead of timing out
     try:
-        WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "table#results-table tbody tr[role='row']")
-            )
+        outcome = WebDriverWait(driver, timeout, poll_frequency=0.2).until(
+            lambda d: d.execute_script(_RESULTS_STATE_JS)
         )
     except TimeoutException:
-        return  # no results – normal
+        # Empty searches report "empty" – a timeout means nothing rendered
+        print(f"  [{category}] gush={gush} helka={helka}: results timed out")
+        return "failed"
+    if outcome != "rows":
+        return "empty"
+
+    # Remember populated helkot so later runs can skip the empty ones
+    conn.execute(
+        "INSERT OR IGNORE INTO sdan_hits (gush, category, helka) VALUES (?, ?, ?)",
+        (gush, category, helka),
+    )
 
     pair_dir = os.path.join(download_root, category, f"{gush}_{helka}")
     ensure_dir(pair_dir)
 
-    rows = driver.find_elements(
-        By.CSS_SELECTOR, "table#results-table tbody tr[role='row']"
-    )
+    rows = snapshot_result_rows(driver)
     print(f"  [{category}] gush={gush} helka={helka}: {len(rows)} result(s)")
 
     # ── First pass: extract metadata from every row before clicking modals ──
-    all_meta: list = []
-    for r in rows:
-        try:
-            if category == "plans":
-                meta = extract_plan_metadata(r, gush, helka)
-            else:
-                meta = extract_permit_metadata(r, gush, helka)
-            all_meta.append(meta)
-            _save_row_metadata(conn, meta, category)
-        except StaleElementReferenceException:
-            all_meta.append({})
+    all_meta = extract_all_rows_meta_js(driver, category, gush, helka, rows)
+    _save_rows_metadata(conn, all_meta, category)
 
     # Save metadata JSON alongside documents
     if all_meta:
@@ -542,89 +1156,125 @@ def _process_one_pair(
                 print(f"    📋 {m['request_number']} – {m['applicant_name']} ({m.get('submission_date','')})")
 
     # ── Second pass: iterate rows again to download documents ──
-    for idx in range(len(rows)):
-        rows = driver.find_elements(
-            By.CSS_SELECTOR, "table#results-table tbody tr[role='row']"
-        )
-        if idx >= len(rows):
-            break
-        row = rows[idx]
-        meta = all_meta[idx] if idx < len(all_meta) else {}
-
-        # Plan / request number
-        if category == "plans":
-            plan_num = meta.get("plan_number", "")
-        else:
-            plan_num = meta.get("request_number", "")
-        if not plan_num:
-            try:
-                plinks = row.find_elements(
-                    By.CSS_SELECTOR, "td a[href^='javascript:get']"
-                )
-                plan_num = plinks[1].text.strip() if len(plinks) > 1 else "unknown"
-            except (IndexError, StaleElementReferenceException):
-                plan_num = f"row_{idx}"
-
-        # Archive button
-        try:
-            abtn = row.find_element(By.CSS_SELECTOR, "button.openBtn")
-        except NoSuchElementException:
-            continue
-
-        safe_click(driver, abtn)
-
+    # Downloads are I/O-bound: one pool per pair, so files of earlier plans
+    # keep downloading while later modals are being opened and read
+    futures: Dict = {}
+    # Every dest submitted for this pair: rows sharing a plan number (or
+    # falling back to "unknown") must not fetch the same file twice at once
+    queued: set = set()
+    try:
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as pool:
+            for idx, row in enumerate(rows):
+                meta = all_meta[idx]
+
+                # Plan / request number
+                if category == "plans":
+                    plan_num = meta.get("plan_number", "")
+                else:
+                    plan_num = meta.get("request_number", "")
+                if not plan_num:
+                    plan_num = row["plan"] or "unknown"
+
+                # Archive button – clicked by row index, so no stale references
+                if not row["has_btn"]:
+                    continue
+                if not driver.execute_script(_CLICK_ARCHIVE_JS, _RESULT_ROWS, idx):
+                    continue
+
+                try:
+                    WebDriverWait(driver, timeout).until(
+                        EC.visibility_of_element_located(
+                            (By.CSS_SELECTOR, "#modal-window .modal-body")
+                        )
+                    )
+                except TimeoutException:
+                    continue
+
+                # Wait for the document links themselves (same selectors as
+                # extract_doc_links) rather than any text, which may just be
+                # a loading placeholder; an empty modal falls through
+                try:
+                    WebDriverWait(driver, timeout).until(EC.any_of(
+                        EC.presence_of_element_located(
+                            (By.CSS_SELECTOR, "#modalcontent table#tblGrid tbody tr")
+                        ),
+                        EC.presence_of_element_located(
+                            (By.CSS_SELECTOR, "#modalcontent a[href*='archive.gis-net']")
+                        ),
+                        EC.presence_of_element_located(
+                            (By.CSS_SELECTOR, "#modalcontent a[target='_blank']")
+                        ),
+                    ))
+                except TimeoutException:
+                    pass
+
+                doc_links = extract_doc_links(driver)
+                close_modal(driver)
+                if not doc_links:
+                    continue
+
+                plan_dir = os.path.join(pair_dir, sanitize(plan_num))
+                ensure_dir(plan_dir)
+
+                # One directory scan instead of a stat per link
+                existing = {
+                    e.name: e.stat().st_size for e in os.scandir(plan_dir) if e.is_file()
+                }
+                cache = load_download_cache(reader, [url for _, url in doc_links])
+
+                for title, url in doc_links:
+                    ext = file_ext(url)
+                    fname = sanitize(title) + ext
+                    dest = os.path.join(plan_dir, fname)
+                    # Skip duplicate titles within the modal or the pair
+                    if dest in queued:
+                        continue
+                    queued.add(dest)
+                    local_size = existing.get(fname)
+                    if local_size is not None and \
+                            "./" + dest.replace("\\", "/") in already:
+                        continue  # recorded in documents on an earlier run
+                    cached = cache.get(url)
+                    if local_size is not None and cached and \
+                            cached[1] == cached[2] == local_size:
+                        continue  # verified complete on an earlier run
+                    etag = cached[0] if cached else None
+                    futures[pool.submit(fetch_document, url, dest, local_size, etag)] = (
+                        plan_num, title, ext, fname, dest, url
+                    )
+    finally:
+        # The pool has drained here. Everything queued is recorded, even if
+        # the pair failed part-way, so documents already on disk stay known.
+        _record_downloads(conn, futures, gush, helka, category, stats)
+    return "rows"
+
+
+def _record_downloads(conn, futures, gush, helka, category, stats) -> None:
+    """Turn finished download futures into ``documents`` / cache rows."""
+    doc_rows: list = []
+    cache_rows: list = []
+    for future in as_completed(futures):
+        plan_num, title, ext, fname, dest, url = futures[future]
         try:
-            WebDriverWait(driver, timeout).until(
-                EC.visibility_of_element_located(
-                    (By.CSS_SELECTOR, "#modal-window .modal-body")
-                )
-            )
-            time.sleep(1.5)
-        except TimeoutException:
+            downloaded, etag, length, fsize = future.result()
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"    ✗ {title}: {e}")
             continue
-
-        doc_links = extract_doc_links(driver)
-        if not doc_links:
-            close_modal(driver)
+        cache_rows.append((url, etag, length, fsize))
+        if not downloaded:
             continue
+        print(f"    ⬇ {plan_num} / {title}{ext}")
+        stats["files"] += 1
 
-        plan_dir = os.path.join(pair_dir, sanitize(plan_num))
-        ensure_dir(plan_dir)
-
-        for title, url in doc_links:
-            ext = file_ext(url)
-            fname = sanitize(title) + ext
-            dest = os.path.join(plan_dir, fname)
-            if os.path.exists(dest):
-                continue
-            try:
-                print(f"    ⬇ {plan_num} / {title}{ext}")
-                download_file(url, dest)
-                stats["files"] += 1
-
-                fsize = os.path.getsize(dest) if os.path.exists(dest) else 0
-                ftype = "image" if ext.lower() in (".jpg", ".jpeg", ".png", ".tif") else (
-                    "pdf" if ext.lower() == ".pdf" else "other"
-                )
-                is_tash = 1 if "תשריט" in title else 0
-                rel_path = "./" + dest.replace("\\", "/")
-
-                # Ensure gush row exists
-                conn.execute(
-                    "INSERT OR IGNORE INTO gushim (gush, name) VALUES (?, ?)",
-                    (gush, f"גוש {gush}"),
-                )
-                conn.execute(
-                    "INSERT OR IGNORE INTO documents "
-                    "(gush, helka, plan_number, title, file_path, file_name, "
-                    "file_size, file_type, category, is_tashrit, is_georef) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
-                    (gush, helka, plan_num, title, rel_path, fname,
-                     fsize, ftype, category, is_tash),
-                )
-                conn.commit()
-            except Exception as e:
-                stats["errors"] += 1
-                print(f"    ✗ {title}: {e}")
-
-        close_modal(driver)
+        ftype = "image" if ext.lower() in (".jpg", ".jpeg", ".png", ".tif") else (
+            "pdf" if ext.lower() == ".pdf" else "other"
+        )
+        is_tash = int(any(m in title for m in _TASHRIT_MARKERS))
+        rel_path = "./" + dest.replace("\\", "/")
+        doc_rows.append((gush, helka, plan_num, title, rel_path, fname,
+                         fsize, ftype, category, is_tash))
+
+    save_download_cache(conn, cache_rows)
+    if doc_rows:
+        conn.executemany(_INSERT_DOC_SQL, doc_rows)
@@ -18,6 +18,9 @@ import signal
 import subprocess
 import sys
 import time
+import urllib.error
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -25,6 +28,7 @@ BACKEND_DIR = BASE_DIR / "backend"
 FRONTEND_DIR = BASE_DIR  # Frontend (vite/src) is at project root
 VENV_PYTHON = BASE_DIR / ".venv" / "Scripts" / "python.exe"
 VENV_UVICORN = BASE_DIR / ".venv" / "Scripts" / "uvicorn.exe"
+BACKEND_HEALTH_URL = "http://127.0.0.1:3001/docs"
 
 
 def find_python():
@@ -58,6 +62,18 @@ def start_frontend():
     )
 
 
+def wait_until_ready(url, proc, timeout=10.0):
+    """Poll *url* until it answers, *proc* exits or *timeout* seconds pass."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and proc.poll() is None:
+        try:
+            urllib.request.urlopen(url, timeout=0.25).close()
+            return True
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.1)
+    return False
+
+
 def main():
     parser = argparse.ArgumentParser(description="Kfar Chabad GIS System Launcher")
     parser.add_argument("--backend", action="store_true", help="Start backend only")
@@ -74,7 +90,9 @@ def main():
             procs.append(("frontend", start_frontend()))
 
         if both:
-            time.sleep(2)
+            backend = procs[0][1]
+            if not wait_until_ready(BACKEND_HEALTH_URL, backend):
+                print("[!] Backend not answering yet on http://127.0.0.1:3001")
             print()
             print("=" * 50)
             print("  Kfar Chabad GIS System Running")
@@ -85,9 +103,16 @@ def main():
             print("  Press Ctrl+C to stop")
             print()
 
-        # Wait for processes
-        for name, proc in procs:
-            proc.wait()
+        # Wait for processes concurrently, reporting each exit as it happens
+        # (a crashed backend is not hidden behind a live frontend)
+        pool = ThreadPoolExecutor(max_workers=len(procs))
+        pending = {pool.submit(proc.wait): name for name, proc in procs}
+        while pending:
+            # Short timeout keeps Ctrl+C responsive on Windows
+            done, _ = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                print(f"[*] {pending.pop(future)} exited with code {future.result()}")
+        pool.shutdown()
 
     except KeyboardInterrupt:
         print("\n[*] Shutting down...")
@@ -7,6 +7,40 @@ const corsHeaders = {
     "authorization, x-client-info, apikey, content-type, x-supabase-client-platform, x-supabase-client-platform-version, x-supabase-client-runtime, x-supabase-client-runtime-version",
 };
 
+// Split a script on top-level semicolons. Semicolons inside '...' strings,
+// -- comments and $tag$ ... $tag$ bodies (functions, DO blocks) are kept.
+function splitStatements(sql: string): string[] {
+  const statements: string[] = [];
+  let start = 0;
+  let i = 0;
+  while (i < sql.length) {
+    const ch = sql[i];
+    if (ch === "'") {
+      // '' inside a string reads as two adjacent strings – same result
+      const end = sql.indexOf("'", i + 1);
+      i = end < 0 ? sql.length : end + 1;
+    } else if (ch === "-" && sql[i + 1] === "-") {
+      const end = sql.indexOf("\n", i);
+      i = end < 0 ? sql.length : end + 1;
+    } else if (ch === "$") {
+      const tag = /^\$[A-Za-z_]*\$/.exec(sql.slice(i, i + 64));
+      if (tag) {
+        const end = sql.indexOf(tag[0], i + tag[0].length);
+        i = end < 0 ? sql.length : end + tag[0].length;
+      } else {
+        i++;
+      }
+    } else if (ch === ";") {
+      statements.push(sql.slice(start, i));
+      start = ++i;
+    } else {
+      i++;
+    }
+  }
+  statements.push(sql.slice(start));
+  return statements.map((s) => s.trim()).filter((s) => s.length > 0);
+}
+
 Deno.serve(async (req) => {
   if (req.method === "OPTIONS") {
     return new Response(null, { headers: corsHeaders });
@@ -32,10 +66,7 @@ Deno.serve(async (req) => {
     const { default: postgres } = await import("https://deno.land/x/postgresjs@v3.4.5/mod.js");
     const pgSql = postgres(dbUrl, { max: 1 });
 
-    const statements = sql
-      .split(/;\s*(?=(?:[^']*'[^']*')*[^']*$)/)
-      .map((s: string) => s.trim())
-      .filter((s: string) => s.length > 0);
+    const statements = splitStatements(sql);
 
     const results: Array<{ statement: string; success: boolean; rows?: any[]; rowCount?: number; error?: string }> = [];
 
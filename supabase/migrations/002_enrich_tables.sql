@@ -151,5 +151,107 @@ CREATE INDEX IF NOT EXISTS idx_plans_main_status ON public.plans(main_status);
 CREATE INDEX IF NOT EXISTS idx_plans_entity_subtype ON public.plans(entity_subtype);
 CREATE INDEX IF NOT EXISTS idx_taba_pl_number ON public.taba_outlines(pl_number);
 
+-- ─── Natural keys for upsert ────────────────────────────────
+-- sync_to_supabase.py upserts with on_conflict on these columns, so
+-- re-running a sync updates rows in place instead of clearing tables.
+CREATE UNIQUE INDEX IF NOT EXISTS uq_taba_outlines_pl_number ON public.taba_outlines(pl_number);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_plan_georef_image_path ON public.plan_georef(image_path);
+
+-- mmg_layers comes from migration 003, which may not be applied yet
+DO $$
+BEGIN
+  IF to_regclass('public.mmg_layers') IS NOT NULL THEN
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_mmg_layers_file_path ON public.mmg_layers(file_path);
+  END IF;
+END;
+$$;
+
+-- permit_documents rows are sent with their parent's natural key
+-- (gush, helka, permit_number) and the trigger fills in permit_id.
+ALTER TABLE public.permit_documents ADD COLUMN IF NOT EXISTS gush INTEGER;
+ALTER TABLE public.permit_documents ADD COLUMN IF NOT EXISTS helka INTEGER;
+ALTER TABLE public.permit_documents ADD COLUMN IF NOT EXISTS permit_number TEXT;
+
+CREATE OR REPLACE FUNCTION public.permit_documents_resolve_permit()
+RETURNS trigger
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+  IF NEW.permit_number IS NOT NULL THEN
+    SELECT id INTO NEW.permit_id
+      FROM public.permits
+     WHERE gush = NEW.gush AND helka = NEW.helka AND permit_id = NEW.permit_number;
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS permit_documents_resolve_permit ON public.permit_documents;
+CREATE TRIGGER permit_documents_resolve_permit
+  BEFORE INSERT OR UPDATE ON public.permit_documents
+  FOR EACH ROW EXECUTE FUNCTION public.permit_documents_resolve_permit();
+
+-- ─── Row counts for sync verification ───────────────────────
+-- POST /rest/v1/rpc/get_counts {"tables": [...]} -> {"gushim": 12, ...}
+-- One call instead of a count HEAD per table. Missing tables report -1.
+CREATE OR REPLACE FUNCTION public.get_counts(tables text[])
+RETURNS json
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT json_object_agg(
+    t,
+    CASE
+      WHEN to_regclass(format('public.%I', t)) IS NULL THEN -1
+      ELSE (xpath('/row/n/text()', query_to_xml(
+        format('SELECT count(*) AS n FROM public.%I', t), false, true, ''
+      )))[1]::text::bigint
+    END
+  )
+  FROM unnest(tables) AS t
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_counts(text[]) TO anon, authenticated;
+
+-- ─── Fast clear before a full sync ──────────────────────────
+-- SELECT public.truncate_tables(ARRAY[...]) – via run-sql, not PostgREST.
+-- One TRUNCATE for all sync tables instead of a row-by-row DELETE each.
+-- It bypasses RLS, so only service_role may call it: the anon key is public.
+-- Only the sync tables below are accepted and missing ones are skipped.
+-- No CASCADE: if other tables reference them the call fails and the
+-- sync script falls back to DELETE.
+CREATE OR REPLACE FUNCTION public.truncate_tables(names text[])
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  allowed CONSTANT text[] := ARRAY[
+    'gushim', 'parcels', 'plans', 'plan_blocks', 'documents', 'permits',
+    'permit_documents', 'taba_outlines', 'plan_georef', 'gis_layers',
+    'migrash_data', 'mmg_layers', 'building_rights', 'plan_instructions'
+  ];
+  targets text;
+BEGIN
+  IF NOT names <@ allowed THEN
+    RAISE EXCEPTION 'truncate_tables: only sync tables can be truncated';
+  END IF;
+  SELECT string_agg(format('public.%I', n), ', ')
+    INTO targets
+    FROM unnest(names) AS n
+   WHERE to_regclass(format('public.%I', n)) IS NOT NULL;
+  IF targets IS NOT NULL THEN
+    EXECUTE 'TRUNCATE TABLE ' || targets || ' RESTART IDENTITY';
+  END IF;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.truncate_tables(text[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.truncate_tables(text[]) FROM anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.truncate_tables(text[]) TO service_role;
+
 -- ─── Reload PostgREST schema cache ──────────────────────────
 NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,169 @@
+"""
+supabase_http.py – Shared plumbing of the Supabase sync / upload scripts
+========================================================================
+
+Used by sync_to_supabase.py, upload_to_supabase.py and
+upload_files_to_storage.py:
+
+  * JSON request bodies (orjson when installed), optionally gzipped
+  * client timeouts and HTTP/2 detection
+  * retries with jittered backoff that honor Retry-After
+  * the tuned read-heavy local SQLite connection
+
+Requirements:
+  pip install httpx tenacity
+  pip install "httpx[http2]"   # optional – multiplexes parallel requests
+  pip install orjson           # optional – faster JSON encoding
+"""
+
+import gzip
+import importlib.util
+import json
+import random
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Optional, Union
+
+try:
+    import httpx
+except ImportError:
+    print("Missing httpx. Run: pip install httpx")
+    sys.exit(1)
+
+try:
+    from tenacity import (
+        retry,
+        retry_if_exception_type,
+        stop_after_attempt,
+        wait_random_exponential,
+    )
+except ImportError:
+    print("Missing tenacity. Run: pip install tenacity")
+    sys.exit(1)
+
+# HTTP/2 lets concurrent requests share one TLS connection
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+try:
+    import orjson
+except ImportError:  # optional – falls back to the stdlib encoder
+    orjson = None
+
+# Fail fast on a dead host, allow slow reads/uploads once connected
+TIMEOUTS = httpx.Timeout(connect=5.0, read=30.0, write=60.0, pool=5.0)
+
+
+# ─── Request bodies ──────────────────────────────────────────────────────────
+
+def dumps(obj) -> bytes:
+    """Encode a request body as UTF-8 JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+# Bodies above this size are gzipped when compression is enabled (--gzip)
+GZIP_MIN_BYTES = 4096
+
+
+def encode_body(obj, compress: bool = False) -> tuple[bytes, dict]:
+    """JSON-encode *obj*; gzip it when *compress* and it is large enough.
+
+    Returns ``(body, extra_headers)`` – ``Content-Encoding`` when gzipped.
+    """
+    body = dumps(obj)
+    if compress and len(body) > GZIP_MIN_BYTES:
+        return gzip.compress(body, compresslevel=1), {"Content-Encoding": "gzip"}
+    return body, {}
+
+
+# ─── Retries ─────────────────────────────────────────────────────────────────
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TransientHTTPError(Exception):
+    """A retryable HTTP status; keeps the response for the final attempt."""
+
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+def check_transient(resp: httpx.Response) -> httpx.Response:
+    """Raise :class:`TransientHTTPError` for a retryable status."""
+    if resp.status_code in RETRY_STATUSES:
+        raise TransientHTTPError(resp)
+    return resp
+
+
+_backoff = wait_random_exponential(multiplier=0.5, max=30)
+
+
+def _wait(retry_state) -> float:
+    """Honor Retry-After when the server sends one, else jittered backoff."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, TransientHTTPError):
+        try:
+            delay = min(float(exc.response.headers["Retry-After"]), 60)
+            return delay + random.uniform(0, 1)  # don't wake all workers at once
+        except (KeyError, ValueError):
+            pass
+    return _backoff(retry_state)
+
+
+def _last_response(retry_state) -> httpx.Response:
+    """Once retries run out, return the last error response (or re-raise)."""
+    exc = retry_state.outcome.exception()
+    if isinstance(exc, TransientHTTPError):
+        return exc.response
+    raise exc
+
+
+# Works on both sync and async functions
+http_retry = retry(
+    stop=stop_after_attempt(6),
+    wait=_wait,
+    retry=retry_if_exception_type((httpx.TransportError, TransientHTTPError)),
+    retry_error_callback=_last_response,
+)
+
+
+@http_retry
+def request(client: httpx.Client, method: str, url: str, **kwargs) -> httpx.Response:
+    """``client.request`` with retries on transport errors and RETRY_STATUSES."""
+    return check_transient(client.request(method, url, **kwargs))
+
+
+@http_retry
+async def arequest(
+    client: httpx.AsyncClient, method: str, url: str, **kwargs
+) -> httpx.Response:
+    """Async :func:`request`."""
+    return check_transient(await client.request(method, url, **kwargs))
+
+
+# ─── Local SQLite ────────────────────────────────────────────────────────────
+
+# Read-heavy settings: WAL (readers never block the scraper's writer),
+# a 256 MB page cache and a 1 GB memory map for the full-table scans
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-262144",
+    "mmap_size=1073741824",
+)
+
+
+def open_sqlite(
+    path: Union[str, Path], row_factory: Optional[type] = None
+) -> sqlite3.Connection:
+    """Open *path* with :data:`SQLITE_PRAGMAS` applied."""
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.row_factory = row_factory
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
@@ -3,27 +3,57 @@ sync_to_supabase.py – Full sync: local SQLite → Supabase cloud
 ================================================================
 
 1. Runs migration SQL via Edge Function (run-sql) to create/alter tables
-2. Clears existing cloud data
-3. Uploads ALL data from local SQLite
+2. Clears cloud tables that have no natural key (all tables with --full)
+3. Upserts ALL data from local SQLite on each table's natural key
 
 Usage:
   python sync_to_supabase.py
+  python sync_to_supabase.py --batch-size 250   # same batch size for every table
+  python sync_to_supabase.py --gzip             # gzip large request bodies
+  python sync_to_supabase.py --full             # wipe every cloud table first
+
+The migration relies on the run-sql Edge Function from this repo, which
+keeps $$-quoted function bodies in one statement. Redeploy it after
+updating (supabase functions deploy run-sql); older copies split the
+plpgsql bodies and the permit_documents trigger / RPCs never install.
 
 Requirements:
-  pip install httpx
+  pip install httpx tenacity
+  pip install "httpx[http2]"   # optional – multiplexes parallel uploads
+  pip install orjson           # optional – faster JSON encoding of batches
+  pip install ijson            # optional – streams the migration response
 """
 
-import json
+import argparse
+import asyncio
+import atexit
+import re
 import sqlite3
 import sys
 import time
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from supabase_http import (
+    HTTP2,
+    RETRY_STATUSES,
+    TIMEOUTS,
+    TransientHTTPError,
+    arequest,
+    dumps,
+    encode_body,
+    http_retry,
+    open_sqlite,
+    request,
+)
+
+import httpx  # presence checked by supabase_http
 
 try:
-    import httpx
-except ImportError:
-    print("Missing httpx. Run: pip install httpx")
-    sys.exit(1)
+    import ijson
+except ImportError:  # optional – falls back to parsing the whole response
+    ijson = None
+
 
 # ─── Configuration ───────────────────────────────────────────────────────────
 SUPABASE_URL = "https://txltujmbkhsszpvsgujs.supabase.co"
@@ -44,6 +74,13 @@ HEADERS = {
     "Content-Type": "application/json",
     "Prefer": "return=representation",
 }
+# Prefer variants, built once and shared by every request (never mutated)
+MINIMAL_HEADERS = {**HEADERS, "Prefer": "return=minimal"}
+MERGE_HEADERS = {**HEADERS, "Prefer": "return=minimal,resolution=merge-duplicates"}
+COUNT_HEADERS = {**HEADERS, "Prefer": "count=exact"}
+
+# run-sql executes the whole migration before it answers (TIMEOUTS otherwise)
+MIGRATION_TIMEOUTS = httpx.Timeout(connect=5.0, read=60.0, write=60.0, pool=5.0)
 
 # Tables in dependency order (FK-safe)
 TABLES_ORDER = [
@@ -64,33 +101,120 @@ TABLES_ORDER = [
 ]
 
 
+# One connection for the whole run, opened on first use
+_CONN: Optional[sqlite3.Connection] = None
+
+
 def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
-def get_local_data(table: str) -> list[dict]:
-    """Read all rows from local SQLite table."""
-    conn = get_db()
-    rows = conn.execute(f"SELECT * FROM {table}").fetchall()
-    conn.close()
-    result = []
-    for row in rows:
-        d = dict(row)
-        # Convert None values to None (JSON null) - this is default
-        # But ensure no Python-specific types leak through
-        for k, v in d.items():
-            if isinstance(v, bytes):
-                d[k] = v.decode("utf-8", errors="replace")
-        result.append(d)
-    return result
+    """The shared local DB connection (closed automatically at exit)."""
+    global _CONN
+    if _CONN is None:
+        _CONN = open_sqlite(DB_PATH, sqlite3.Row)
+        atexit.register(_CONN.close)
+    return _CONN
+
+
+def _rows_to_dicts(cols: list[str], rows: list[tuple]) -> list[dict]:
+    """Zip plain SQLite rows with their column names, decoding stray bytes.
+
+    The batch is transposed so the bytes check runs once per column and
+    only columns that actually hold bytes are rebuilt.
+    """
+    columns = list(zip(*rows))
+    for i, col in enumerate(columns):
+        # Ensure no Python-specific types leak through into the JSON body
+        if bytes in set(map(type, col)):
+            columns[i] = [
+                v.decode("utf-8", errors="replace") if type(v) is bytes else v
+                for v in col
+            ]
+    return [dict(zip(cols, vals)) for vals in zip(*columns)]
+
+
+def _iter_batches(sql: str, batch_size: int) -> Iterator[list[dict]]:
+    """Run *sql* and stream its rows as lists of up to *batch_size* dicts."""
+    cur = get_db().cursor()
+    cur.row_factory = None  # plain tuples, zipped per batch
+    cur.execute(sql)
+    cur.arraysize = batch_size
+    cols = [c[0] for c in cur.description]
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        yield _rows_to_dicts(cols, rows)
+
+
+def count_local_rows(table: str) -> int:
+    """Row count of a local SQLite table."""
+    return get_db().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def iter_local_data(table: str, batch_size: int = 500) -> Iterator[list[dict]]:
+    """Stream rows of a local SQLite table as lists of up to *batch_size* dicts.
+
+    Only one batch is held in memory at a time.
+    """
+    return _iter_batches(f"SELECT * FROM {table}", batch_size)
+
+
+# ─── Retried requests ───────────────────────────────────────────────────────
+# (policy and request()/arequest() live in supabase_http)
+
+@http_retry
+def _open_stream(client: httpx.Client, method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request with a streamed response body (caller closes it)."""
+    resp = client.send(client.build_request(method, url, **kwargs), stream=True)
+    if resp.status_code in RETRY_STATUSES:
+        resp.read()  # keep the error body for the caller, then release
+        raise TransientHTTPError(resp)
+    return resp
+
+
+def _run_sql(client: httpx.Client, sql: str) -> httpx.Response:
+    """POST a short SQL script to the run-sql Edge Function."""
+    return request(
+        client, "POST", f"{SUPABASE_URL}/functions/v1/run-sql",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+        },
+        content=dumps({"sql": sql}),
+    )
+
+
+# ─── Step 0: Check Connection ───────────────────────────────────────────────
+
+def check_connection(client: httpx.Client) -> None:
+    """Exit early if Supabase is unreachable or rejects the API key."""
+    try:
+        probe = request(
+            client, "GET", f"{SUPABASE_URL}/rest/v1/", headers=HEADERS, timeout=5
+        )
+    except httpx.TransportError as e:
+        print(f"  Cannot reach {SUPABASE_URL}: {e}")
+        sys.exit(1)
+    if probe.status_code in (401, 403):
+        print(f"  Supabase rejected the API key: {probe.status_code}")
+        sys.exit(1)
+    if probe.status_code >= 500:
+        print(f"  Supabase is unavailable: {probe.status_code}")
+        sys.exit(1)
 
 
 # ─── Step 1: Run Migration ──────────────────────────────────────────────────
 
-def run_migration(client: httpx.Client) -> bool:
-    """Execute migration SQL via the run-sql Edge Function."""
+# "already exists" errors are fine for idempotent migrations. A str pattern:
+# the results are streamed and ijson hands back decoded strings, so there
+# is no raw body to scan with a bytes pattern
+_EXISTS_RE = re.compile("already exists", re.IGNORECASE)
+
+
+def run_migration(client: httpx.Client, compress: bool = False) -> bool:
+    """Execute migration SQL via the run-sql Edge Function.
+
+    With *compress*, the SQL payload is sent gzip-compressed.
+    """
     print("\n" + "=" * 60)
     print("   Step 1: Running Migration SQL")
     print("=" * 60)
@@ -103,40 +227,74 @@ def run_migration(client: httpx.Client) -> bool:
     print(f"  SQL file: {MIGRATION_SQL.name} ({len(sql)} chars)")
 
     url = f"{SUPABASE_URL}/functions/v1/run-sql"
-    resp = client.post(
+    total = succeeded = 0
+    body, extra = encode_body({"sql": sql}, compress)
+    resp = _open_stream(
+        client,
+        "POST",
         url,
-        json={"sql": sql},
+        content=body,
         headers={
             "Content-Type": "application/json",
             "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+            **extra,
         },
-        timeout=60,
+        timeout=MIGRATION_TIMEOUTS,
     )
-
-    if resp.status_code != 200:
-        print(f"  Edge Function error: {resp.status_code}")
-        print(f"  {resp.text[:500]}")
-        return False
-
-    data = resp.json()
-    summary = data.get("summary", {})
-    print(f"  Executed {summary.get('total', 0)} statements")
-    print(f"  Succeeded: {summary.get('succeeded', 0)}")
-    print(f"  Failed: {summary.get('failed', 0)}")
-
-    # Show failures
-    for r in data.get("results", []):
-        if not r.get("success"):
-            stmt = r.get("statement", "")[:100]
+    try:
+        if resp.status_code != 200:
+            resp.read()
+            print(f"  Edge Function error: {resp.status_code}")
+            print(f"  {resp.text[:500]}")
+            return False
+
+        # Count results and show failures as they stream in
+        for r in _iter_json_items(resp, "results.item"):
+            total += 1
+            if r.get("success"):
+                succeeded += 1
+                continue
             err = r.get("error", "")
-            # Skip "already exists" errors - they're fine for idempotent migrations
-            if "already exists" in err.lower():
+            if _EXISTS_RE.search(err):
                 continue
-            print(f"  WARN: {stmt}... -> {err}")
+            print(f"  WARN: {r.get('statement', '')[:100]}... -> {err}")
+    finally:
+        resp.close()
+
+    print(f"  Executed {total} statements")
+    print(f"  Succeeded: {succeeded}")
+    print(f"  Failed: {total - succeeded}")
 
     return True
 
 
+def _iter_json_items(resp: httpx.Response, prefix: str) -> Iterator[dict]:
+    """Yield the JSON items at ijson *prefix* (e.g. ``"results.item"``).
+
+    With ijson each item is parsed as its bytes arrive and then dropped;
+    without it the body is read and parsed in one go.
+    """
+    if ijson is None:
+        resp.read()
+        yield from _items_at(resp.json(), prefix)
+        return
+    events = ijson.sendable_list()
+    coro = ijson.items_coro(events, prefix)
+    for chunk in resp.iter_bytes():
+        coro.send(chunk)
+        yield from events
+        del events[:]
+    coro.close()
+    yield from events
+
+
+def _items_at(data, prefix: str) -> list:
+    """The list an ijson ``"a.b.item"`` prefix points at, from parsed JSON."""
+    for key in prefix.split(".")[:-1]:
+        data = data.get(key, []) if isinstance(data, dict) else []
+    return data if isinstance(data, list) else []
+
+
 # ─── Step 2: Clear Cloud Data ───────────────────────────────────────────────
 
 def clear_table(client: httpx.Client, table: str) -> bool:
@@ -147,11 +305,7 @@ def clear_table(client: httpx.Client, table: str) -> bool:
     else:
         url = f"{SUPABASE_URL}/rest/v1/{table}?id=gte.0"
 
-    # Need delete headers
-    headers = {**HEADERS}
-    headers["Prefer"] = "return=minimal"
-
-    resp = client.delete(url, headers=headers)
+    resp = request(client, "DELETE", url, headers=MINIMAL_HEADERS)
     if resp.status_code in (200, 204):
         print(f"  Cleared {table}")
         return True
@@ -164,22 +318,107 @@ def clear_table(client: httpx.Client, table: str) -> bool:
         return True
 
 
-def clear_all_data(client: httpx.Client):
-    """Clear all cloud data in reverse FK order."""
+def clear_all_data(client: httpx.Client, tables: Optional[list[str]] = None):
+    """Clear cloud data in reverse FK order (*tables* defaults to all)."""
     print("\n" + "=" * 60)
     print("   Step 2: Clearing Existing Cloud Data")
     print("=" * 60)
 
-    for table in reversed(TABLES_ORDER):
-        clear_table(client, table)
+    tables = [t for t in reversed(TABLES_ORDER) if tables is None or t in tables]
+
+    # One TRUNCATE via truncate_tables (service_role only, so it runs through
+    # run-sql rather than PostgREST); per-table DELETE otherwise
+    names = ", ".join(f"'{t}'" for t in tables)
+    resp = _run_sql(client, f"SELECT public.truncate_tables(ARRAY[{names}]::text[])")
+    result = {}
+    if resp.status_code == 200:
+        results = resp.json().get("results") or [{}]
+        result = results[0]
+    if result.get("success"):
+        print(f"  Truncated {len(tables)} tables")
+    else:
+        error = result.get("error") or f"{resp.status_code} - {resp.text[:200]}"
+        print(f"  truncate_tables: {error}")
+        print("  Falling back to DELETE per table...")
+        for table in tables:
+            clear_table(client, table)
     print("  Done clearing.")
 
 
 # ─── Step 3: Upload Data ────────────────────────────────────────────────────
 
-def upload_table(client: httpx.Client, table: str, rows: list[dict]) -> bool:
-    """Upload rows to Supabase in batches."""
-    if not rows:
+# Batches of one table in flight at once (tables still go in FK order)
+UPLOAD_CONCURRENCY = 16
+
+# Rows per POST – wide tables / big geojson get smaller batches
+DEFAULT_BATCH_SIZE = 500
+BATCH_SIZES = {
+    "gushim": 1000,
+    "parcels": 1000,
+    "plans": 500,
+    "plan_blocks": 1000,
+    "documents": 500,
+    "permits": 1000,
+    "permit_documents": 1000,
+    "taba_outlines": 500,
+    "plan_georef": 200,
+}
+
+
+# on_conflict columns for upserts (UNIQUE in the cloud schema). Tables
+# without a natural key are cleared and re-inserted on every run.
+UPSERT_KEYS = {
+    "gushim": "gush",
+    "parcels": "gush,helka",
+    "plans": "plan_number",
+    "plan_blocks": "plan_number,gush,helka",
+    "documents": "file_path",
+    "permits": "gush,helka,permit_id",
+    "permit_documents": "file_path",
+    "taba_outlines": "pl_number",
+    "plan_georef": "image_path",
+    "mmg_layers": "file_path",
+}
+REPLACED_TABLES = [t for t in TABLES_ORDER if t not in UPSERT_KEYS]
+
+# Per-table request target and headers, looked up instead of rebuilt
+TABLE_HEADERS = {
+    t: MERGE_HEADERS if t in UPSERT_KEYS else MINIMAL_HEADERS for t in TABLES_ORDER
+}
+TABLE_URLS = {
+    t: f"{SUPABASE_URL}/rest/v1/{t}"
+    + (f"?on_conflict={UPSERT_KEYS[t]}" if t in UPSERT_KEYS else "")
+    for t in TABLES_ORDER
+}
+
+
+def batch_size_for(table: str, override: Optional[int] = None) -> int:
+    """Upload batch size for *table* (a ``--batch-size`` override wins)."""
+    return override or BATCH_SIZES.get(table, DEFAULT_BATCH_SIZE)
+
+
+def make_async_client(concurrency: int = UPLOAD_CONCURRENCY) -> httpx.AsyncClient:
+    """Async client whose pool matches the upload fan-out (HTTP/2 if h2 is installed)."""
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    return httpx.AsyncClient(timeout=TIMEOUTS, limits=limits, http2=HTTP2)
+
+
+async def upload_table_async(
+    client: httpx.AsyncClient,
+    table: str,
+    batches: Iterable[list[dict]],
+    total: int,
+    concurrency: int = UPLOAD_CONCURRENCY,
+    compress: bool = False,
+) -> bool:
+    """Upload row batches (e.g. from :func:`iter_local_data`) to Supabase.
+
+    Up to *concurrency* batches are POSTed at once; the next batch is read
+    only when a slot frees up. With *compress*, large bodies are gzipped.
+    """
+    if not total:
         print(f"  {table}: no rows to upload")
         return True
 
@@ -189,40 +428,27 @@ def upload_table(client: httpx.Client, table: str, rows: list[dict]) -> bool:
                       "gis_layers", "migrash_data", "mmg_layers",
                       "building_rights", "plan_instructions"}
 
-    if table in auto_id_tables:
-        for r in rows:
-            r.pop("id", None)
-
-    # For permit_documents, we need to map the local permit_id (integer FK)
-    # to the new Supabase permit_id. We'll handle this separately.
+    # Upsert on the natural key where there is one, plain insert otherwise
+    url = TABLE_URLS[table]
+    headers = TABLE_HEADERS[table]
 
-    batch_size = 50
-    total = len(rows)
+    sem = asyncio.Semaphore(concurrency)
     success_count = 0
 
-    for i in range(0, total, batch_size):
-        batch = rows[i: i + batch_size]
-        url = f"{SUPABASE_URL}/rest/v1/{table}"
-
-        headers = {**HEADERS}
-        # Use upsert mode for tables with natural keys
-        if table == "gushim":
-            headers["Prefer"] = "return=representation,resolution=merge-duplicates"
-        elif table == "parcels":
-            headers["Prefer"] = "return=representation,resolution=merge-duplicates"
-            # parcels has UNIQUE(gush, helka)
-        elif table == "plans":
-            headers["Prefer"] = "return=representation,resolution=merge-duplicates"
-            # plans has UNIQUE(plan_number)
-        elif table == "plan_blocks":
-            headers["Prefer"] = "return=representation,resolution=merge-duplicates"
-            # plan_blocks has UNIQUE(plan_number, gush, helka)
-        else:
-            headers["Prefer"] = "return=representation"
-
-        resp = client.post(url, headers=headers, json=batch)
+    async def send(i: int, batch: list[dict]) -> None:
+        nonlocal success_count
+        body, extra = encode_body(batch, compress)
+        resp = await arequest(
+            client, "POST", url,
+            headers={**headers, **extra} if extra else headers, content=body,
+        )
 
-        if resp.status_code in (200, 201):
+        if resp.status_code == 413 and len(batch) > 1:
+            # Body too large – split in half instead of going row by row
+            mid = len(batch) // 2
+            await send(i, batch[:mid])
+            await send(i, batch[mid:])
+        elif resp.status_code in (200, 201):
             success_count += len(batch)
             pct = int(success_count / total * 100)
             print(f"  {table}: {success_count}/{total} ({pct}%)", end="\r")
@@ -232,115 +458,146 @@ def upload_table(client: httpx.Client, table: str, rows: list[dict]) -> bool:
             print(f"  {err_text}")
             # Try individual inserts for the failed batch
             for row in batch:
-                resp2 = client.post(url, headers=headers, json=[row])
+                resp2 = await arequest(
+                    client, "POST", url, headers=headers, content=dumps([row])
+                )
                 if resp2.status_code in (200, 201):
                     success_count += 1
                 else:
                     # Log but continue
                     print(f"  Skip row: {resp2.text[:200]}")
 
+    async def send_slot(i: int, batch: list[dict]) -> None:
+        try:
+            await send(i, batch)
+        finally:
+            sem.release()
+
+    tasks = []
+    for i, batch in enumerate(batches):
+        if table in auto_id_tables:
+            for r in batch:
+                r.pop("id", None)
+        await sem.acquire()
+        tasks.append(asyncio.create_task(send_slot(i, batch)))
+
+    for i, result in enumerate(await asyncio.gather(*tasks, return_exceptions=True)):
+        if isinstance(result, Exception):
+            print(f"\n  ERROR {table} batch {i}: {result}")
+
     print(f"  {table}: {success_count}/{total} rows uploaded")
     return success_count > 0 or total == 0
 
 
-def upload_all_data(client: httpx.Client):
-    """Upload all tables from local SQLite to Supabase."""
+async def upload_all_data(batch_size: Optional[int] = None, compress: bool = False):
+    """Upload all tables from local SQLite to Supabase.
+
+    *batch_size* overrides the per-table :data:`BATCH_SIZES`; *compress*
+    gzips large request bodies.
+    """
     print("\n" + "=" * 60)
     print("   Step 3: Uploading Data")
     print("=" * 60)
 
-    # We need special handling for permit_documents because the
-    # permit_id FK references the Supabase-generated permits.id
-    # Strategy: Upload permits first, then map IDs for permit_documents
-
-    for table in TABLES_ORDER:
-        if table == "permit_documents":
-            continue  # Handle separately after permits
-        print(f"\n  Uploading {table}...")
-        rows = get_local_data(table)
-        print(f"  Found {len(rows)} rows in local DB")
-        upload_table(client, table, rows)
-
-    # Now handle permit_documents with ID mapping
-    print(f"\n  Uploading permit_documents (with FK mapping)...")
-    upload_permit_documents(client)
-
+    async with make_async_client() as client:
+        for table in TABLES_ORDER:
+            if table == "permit_documents":
+                print(f"\n  Uploading permit_documents (keyed by parent permit)...")
+                await upload_permit_documents(client, batch_size, compress)
+                continue
+            print(f"\n  Uploading {table}...")
+            total = count_local_rows(table)
+            print(f"  Found {total} rows in local DB")
+            batches = iter_local_data(table, batch_size_for(table, batch_size))
+            await upload_table_async(
+                client, table, batches, total, compress=compress
+            )
+
+
+async def upload_permit_documents(
+    client: httpx.AsyncClient,
+    batch_size: Optional[int] = None,
+    compress: bool = False,
+):
+    """Upload permit_documents keyed by their parent permit's natural key.
+
+    The cloud trigger resolves (gush, helka, permit_number) to permits.id,
+    so no cloud ids have to be fetched first.
+    """
+    total = get_db().execute("""
+        SELECT COUNT(*) FROM permit_documents pd
+        JOIN permits p ON pd.permit_id = p.id
+    """).fetchone()[0]
+    print(f"  Found {total} permit documents to upload")
+    batches = _iter_permit_docs(batch_size_for("permit_documents", batch_size))
+    await upload_table_async(
+        client, "permit_documents", batches, total, compress=compress
+    )
 
-def upload_permit_documents(client: httpx.Client):
-    """Upload permit_documents with proper FK mapping."""
-    conn = get_db()
 
-    # Get local permit_documents with their parent permit info
-    local_docs = conn.execute("""
-        SELECT pd.*, p.gush, p.helka, p.permit_id as parent_permit_id
+def _iter_permit_docs(batch_size: int) -> Iterator[list[dict]]:
+    """Stream local permit_documents with their parent permit's natural key."""
+    return _iter_batches("""
+        SELECT pd.file_name, pd.file_path, pd.file_size, pd.file_type,
+               p.gush, p.helka, p.permit_id AS permit_number
         FROM permit_documents pd
         JOIN permits p ON pd.permit_id = p.id
-    """).fetchall()
-    conn.close()
+    """, batch_size)
 
-    if not local_docs:
-        print("  permit_documents: no rows to upload")
-        return
 
-    # Get the Supabase permits to find the new IDs
-    resp = client.get(
-        f"{SUPABASE_URL}/rest/v1/permits?select=id,gush,helka,permit_id",
+# ─── Step 4: Verify ─────────────────────────────────────────────────────────
+
+async def _cloud_counts(client: httpx.AsyncClient) -> dict:
+    """Row counts of every table in TABLES_ORDER, -1 where unknown.
+
+    Uses the get_counts RPC (one round trip); if it is not installed yet,
+    falls back to one count=exact HEAD per table, sent concurrently.
+    """
+    resp = await arequest(
+        client, "POST", f"{SUPABASE_URL}/rest/v1/rpc/get_counts",
         headers=HEADERS,
+        content=dumps({"tables": TABLES_ORDER}),
     )
-    if resp.status_code != 200:
-        print(f"  ERROR: Cannot fetch Supabase permits: {resp.status_code}")
-        return
-
-    cloud_permits = resp.json()
-    # Build mapping: (gush, helka, permit_id) -> cloud id
-    permit_map = {}
-    for p in cloud_permits:
-        key = (p["gush"], p["helka"], p["permit_id"])
-        permit_map[key] = p["id"]
-
-    rows = []
-    for doc in local_docs:
-        d = dict(doc)
-        lookup_key = (d["gush"], d["helka"], d["parent_permit_id"])
-        cloud_permit_id = permit_map.get(lookup_key)
-        if cloud_permit_id is None:
-            continue  # Skip if parent permit not found in cloud
-        rows.append({
-            "permit_id": cloud_permit_id,
-            "file_name": d["file_name"],
-            "file_path": d["file_path"],
-            "file_size": d.get("file_size", 0),
-            "file_type": d.get("file_type"),
-        })
-
-    print(f"  Found {len(rows)} permit documents to upload")
-    upload_table(client, "permit_documents", rows)
+    if resp.status_code == 200 and isinstance(resp.json(), dict):
+        return resp.json()
 
+    responses = await asyncio.gather(*(
+        arequest(
+            client, "HEAD", f"{SUPABASE_URL}/rest/v1/{table}?select=*",
+            headers=COUNT_HEADERS,
+        )
+        for table in TABLES_ORDER
+    ))
+    counts = {}
+    for table, resp in zip(TABLES_ORDER, responses):
+        range_header = resp.headers.get("content-range", "?/?")
+        cloud_count_str = range_header.split("/")[-1]
+        try:
+            counts[table] = int(cloud_count_str)
+        except ValueError:
+            counts[table] = -1
+    return counts
 
-# ─── Step 4: Verify ─────────────────────────────────────────────────────────
 
-def verify(client: httpx.Client):
+async def verify():
     """Compare local vs cloud row counts."""
     print("\n" + "=" * 60)
     print("   Step 4: Verification")
     print("=" * 60)
 
-    conn = get_db()
+    async with make_async_client() as client:
+        cloud_counts = await _cloud_counts(client)
+
+    # All local counts in one query
+    local_counts = dict(get_db().execute(" UNION ALL ".join(
+        f"SELECT '{table}', COUNT(*) FROM {table}" for table in TABLES_ORDER
+    )).fetchall())
+
     all_ok = True
 
     for table in TABLES_ORDER:
-        local_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
-
-        resp = client.head(
-            f"{SUPABASE_URL}/rest/v1/{table}?select=*",
-            headers={**HEADERS, "Prefer": "count=exact"},
-        )
-        range_header = resp.headers.get("content-range", "?/?")
-        cloud_count_str = range_header.split("/")[-1]
-        try:
-            cloud_count = int(cloud_count_str)
-        except ValueError:
-            cloud_count = -1
+        local_count = local_counts[table]
+        cloud_count = cloud_counts.get(table, -1)
 
         match = cloud_count == local_count
         icon = "OK" if match else "!!"
@@ -348,8 +605,6 @@ def verify(client: httpx.Client):
         if not match:
             all_ok = False
 
-    conn.close()
-
     if all_ok:
         print("\n  All tables match!")
     else:
@@ -361,6 +616,21 @@ def verify(client: httpx.Client):
 # ─── Main ────────────────────────────────────────────────────────────────────
 
 def main():
+    parser = argparse.ArgumentParser(description="Sync local SQLite -> Supabase")
+    parser.add_argument(
+        "--batch-size", type=int, default=None,
+        help="Rows per upload request for every table (default: per-table BATCH_SIZES)",
+    )
+    parser.add_argument(
+        "--gzip", action="store_true",
+        help="Send request bodies over 4 KB gzip-compressed (Content-Encoding: gzip)",
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Clear every cloud table before uploading (drops rows deleted locally)",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("   Sync Local SQLite -> Supabase Cloud")
     print("=" * 60)
@@ -371,10 +641,11 @@ def main():
         print("  Local database not found!")
         sys.exit(1)
 
-    client = httpx.Client(timeout=30)
+    client = httpx.Client(timeout=TIMEOUTS)
+    check_connection(client)
 
     # Step 1: Run migration
-    if not run_migration(client):
+    if not run_migration(client, args.gzip):
         print("\n  Migration failed. You can also run the SQL manually")
         print("  in Supabase Dashboard -> SQL Editor.")
         print(f"  File: {MIGRATION_SQL}")
@@ -382,18 +653,18 @@ def main():
 
     time.sleep(1)
 
-    # Step 2: Clear existing data
-    clear_all_data(client)
+    # Step 2: Clear tables that cannot be upserted (everything with --full)
+    clear_all_data(client, None if args.full else REPLACED_TABLES)
 
     time.sleep(1)
 
     # Step 3: Upload all data
-    upload_all_data(client)
+    asyncio.run(upload_all_data(args.batch_size, args.gzip))
 
     time.sleep(2)
 
     # Step 4: Verify
-    verify(client)
+    asyncio.run(verify())
 
     client.close()
     print("\n  Done!")
@@ -0,0 +1,118 @@
+"""Tests for the helka short-list gating and the HEAD freshness check."""
+
+import pytest
+import requests
+
+import sdan_common
+from sdan_common import HELKA_RANGE, known_helkot, open_db, open_db_readonly
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "sdan.db")
+    open_db(path).close()
+    return path
+
+
+class _FakeDriver:
+    def delete_all_cookies(self):
+        pass
+
+
+def _run_gush(monkeypatch, tmp_path, db_path, outcomes=None, **kwargs):
+    """process_gush with the browser steps stubbed; returns searched helkot."""
+    outcomes = outcomes or {}
+    searched = []
+
+    def search(driver, gush, helka, *args):
+        searched.append(helka)
+        return outcomes.get(helka, "empty")
+
+    monkeypatch.setattr(sdan_common, "_open_search_form", lambda *a: True)
+    monkeypatch.setattr(sdan_common, "_search_one_helka", search)
+    sdan_common.process_gush(
+        6260, "plans", str(tmp_path / "dl"), db_path=db_path,
+        driver=_FakeDriver(), **kwargs,
+    )
+    return searched
+
+
+def _scanned(db_path):
+    conn = open_db_readonly(db_path)
+    try:
+        return conn.execute("SELECT gush, category FROM sdan_scans").fetchall()
+    finally:
+        conn.close()
+
+
+def test_known_helkot_full_range_until_scanned(db_path):
+    conn = open_db(db_path)
+    conn.execute(
+        "INSERT INTO sdan_hits (gush, category, helka) VALUES (6260, 'plans', 7)"
+    )
+    conn.commit()
+    reader = open_db_readonly(db_path)
+    assert known_helkot(reader, 6260, "plans") is HELKA_RANGE
+
+    conn.execute("INSERT INTO sdan_scans (gush, category) VALUES (6260, 'plans')")
+    conn.commit()
+    assert known_helkot(reader, 6260, "plans") == [7]
+    assert known_helkot(reader, 6260, "permits") is HELKA_RANGE
+    reader.close()
+    conn.close()
+
+
+def test_full_pass_records_scan(monkeypatch, tmp_path, db_path):
+    searched = _run_gush(monkeypatch, tmp_path, db_path, {5: "rows"})
+    assert searched == list(HELKA_RANGE)
+    assert _scanned(db_path) == [(6260, "plans")]
+
+
+def test_failed_helka_keeps_full_range(monkeypatch, tmp_path, db_path):
+    _run_gush(monkeypatch, tmp_path, db_path, {5: "rows", 9: "failed"})
+    assert _scanned(db_path) == []
+
+
+def test_partial_range_is_not_recorded(monkeypatch, tmp_path, db_path):
+    _run_gush(monkeypatch, tmp_path, db_path, helka_range=range(1, 11))
+    assert _scanned(db_path) == []
+
+
+def test_probe_skip_is_not_recorded(monkeypatch, tmp_path, db_path):
+    monkeypatch.setattr(sdan_common, "parcel_exists", lambda g, h: h != 3)
+    searched = _run_gush(monkeypatch, tmp_path, db_path, probe_parcels=True)
+    assert 3 not in searched
+    assert _scanned(db_path) == []
+
+
+class _Head:
+    def __init__(self, status, headers):
+        self.status_code = status
+        self.headers = headers
+
+
+@pytest.mark.parametrize(
+    "status, headers, expected",
+    [
+        (304, {}, True),
+        (200, {"Content-Length": "100", "ETag": "x"}, True),
+        (200, {"Content-Length": "99"}, False),
+        (200, {}, True),
+        (200, {"Content-Length": "40", "Content-Encoding": "gzip"}, True),
+        (403, {"Content-Length": "100"}, False),
+        (404, {}, False),
+    ],
+)
+def test_remote_unchanged(monkeypatch, status, headers, expected):
+    monkeypatch.setattr(
+        sdan_common._SESSION, "head", lambda url, **kw: _Head(status, headers)
+    )
+    assert sdan_common.remote_unchanged("https://x/doc.pdf", 100, "x")[0] is expected
+
+
+def test_remote_unchanged_head_error(monkeypatch):
+    def fail(url, **kw):
+        raise requests.ConnectionError("refused")
+
+    monkeypatch.setattr(sdan_common._SESSION, "head", fail)
+    assert sdan_common.remote_unchanged("https://x/doc.pdf", 100, "x") == (False, "x", 0)
@@ -0,0 +1,55 @@
+"""Tests for the shared retry policy in supabase_http."""
+
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from tenacity import wait_none
+
+import supabase_http
+from supabase_http import TransientHTTPError, _wait
+
+
+def _retry_state(exc):
+    return SimpleNamespace(
+        outcome=SimpleNamespace(exception=lambda: exc), attempt_number=1
+    )
+
+
+def test_wait_honors_retry_after_with_jitter():
+    resp = httpx.Response(429, headers={"Retry-After": "3"})
+    delay = _wait(_retry_state(TransientHTTPError(resp)))
+    assert 3 <= delay < 4
+
+
+def test_wait_caps_retry_after():
+    resp = httpx.Response(503, headers={"Retry-After": "3600"})
+    assert _wait(_retry_state(TransientHTTPError(resp))) < 61
+
+
+@pytest.mark.parametrize("headers", [{}, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}])
+def test_wait_falls_back_to_backoff(headers):
+    resp = httpx.Response(503, headers=headers)
+    assert 0 <= _wait(_retry_state(TransientHTTPError(resp))) <= 30
+
+
+def test_request_retries_transient_statuses(monkeypatch):
+    monkeypatch.setattr(supabase_http.request.retry, "wait", wait_none())
+    statuses = iter([503, 429, 200])
+    client = httpx.Client(
+        transport=httpx.MockTransport(lambda r: httpx.Response(next(statuses)))
+    )
+    assert supabase_http.request(client, "GET", "https://example.test/").status_code == 200
+
+
+def test_request_returns_last_response_when_retries_run_out(monkeypatch):
+    monkeypatch.setattr(supabase_http.request.retry, "wait", wait_none())
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    assert supabase_http.request(client, "GET", "https://example.test/").status_code == 503
+    assert len(calls) == 6
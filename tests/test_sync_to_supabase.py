@@ -0,0 +1,73 @@
+"""Tests for the batching and upload helpers of sync_to_supabase."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from tenacity import wait_none
+
+import supabase_http
+import sync_to_supabase as sync
+
+
+@pytest.fixture
+def local_db(tmp_path, monkeypatch):
+    """A small local DB in place of kfar_chabad_documents.db."""
+    monkeypatch.setattr(sync, "DB_PATH", tmp_path / "local.db")
+    monkeypatch.setattr(sync, "_CONN", None)
+    conn = sync.get_db()
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT, raw BLOB)")
+    conn.executemany(
+        "INSERT INTO t VALUES (?, ?, ?)",
+        [(i, f"n{i}", b"\xd7\x90" if i == 3 else None) for i in range(1, 6)],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_rows_to_dicts_zips_columns():
+    rows = [(1, "a"), (2, "b")]
+    assert sync._rows_to_dicts(["id", "name"], rows) == [
+        {"id": 1, "name": "a"},
+        {"id": 2, "name": "b"},
+    ]
+
+
+def test_rows_to_dicts_decodes_bytes():
+    rows = [(1, b"\xd7\x90"), (2, None), (3, b"\xff")]
+    assert [r["v"] for r in sync._rows_to_dicts(["id", "v"], rows)] == [
+        "א", None, "�"
+    ]
+
+
+def test_iter_batches_streams_fixed_size_batches(local_db):
+    batches = list(sync._iter_batches("SELECT * FROM t ORDER BY id", 2))
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert batches[0][0] == {"id": 1, "name": "n1", "raw": None}
+    assert batches[1][0]["raw"] == "א"
+
+
+def test_iter_batches_empty_table(local_db):
+    local_db.execute("DELETE FROM t")
+    assert list(sync._iter_batches("SELECT * FROM t", 2)) == []
+
+
+def test_upload_splits_batch_on_413(monkeypatch):
+    monkeypatch.setattr(supabase_http.arequest.retry, "wait", wait_none())
+    sizes = []
+
+    def handler(request):
+        n = len(json.loads(request.content))
+        sizes.append(n)
+        return httpx.Response(413 if n > 2 else 201)
+
+    async def upload():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            batch = [{"id": i, "gush": 6260, "helka": i} for i in range(5)]
+            return await sync.upload_table_async(client, "parcels", [batch], 5)
+
+    assert asyncio.run(upload())
+    assert sizes == [5, 2, 3, 1, 2]
@@ -7,19 +7,23 @@ Preserves directory structure. Skips files already uploaded.
 
 Usage:
   python upload_files_to_storage.py
+
+Requirements:
+  pip install httpx tenacity
+  pip install "httpx[http2]"   # optional – multiplexes parallel uploads
 """
 
+import asyncio
+import json
 import mimetypes
 import os
 import sys
 import time
 from pathlib import Path
 
-try:
-    import httpx
-except ImportError:
-    print("Missing httpx. Run: pip install httpx")
-    sys.exit(1)
+from supabase_http import HTTP2, check_transient, http_retry
+
+import httpx  # presence checked by supabase_http
 
 # ─── Configuration ───────────────────────────────────────────────────────────
 SUPABASE_URL = "https://txltujmbkhsszpvsgujs.supabase.co"
@@ -37,30 +41,132 @@ MAX_FILE_SIZE = 15 * 1024 * 1024  # 15MB
 
 STORAGE_URL = f"{SUPABASE_URL}/storage/v1/object/{BUCKET}"
 
+# {remote_path: [size, mtime_ns]} of files known to be in the bucket
+MANIFEST_PATH = BASE_DIR / ".storage_manifest.json"
+
+AUTH_HEADERS = {
+    "apikey": SUPABASE_ANON_KEY,
+    "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+}
+
+
+# MIME types of the extensions found under kfar_chabad_data; others fall
+# back to the mimetypes database
+EXT_TO_CT = {
+    ".pdf": "application/pdf",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".tif": "image/tiff",
+    ".tiff": "image/tiff",
+    ".json": "application/json",
+    ".geojson": "application/geo+json",
+    ".dwg": "image/vnd.dwg",
+    ".zip": "application/zip",
+}
 
-def get_content_type(file_path: Path) -> str:
+
+def get_content_type(file_path: str) -> str:
     """Guess MIME type from file extension."""
-    ct, _ = mimetypes.guess_type(str(file_path))
+    ct = EXT_TO_CT.get(os.path.splitext(file_path)[1].lower())
+    if ct is None:
+        ct, _ = mimetypes.guess_type(file_path)
     return ct or "application/octet-stream"
 
 
-def upload_file(client: httpx.Client, local_path: Path, remote_path: str) -> bool:
-    """Upload a single file to Supabase Storage."""
-    url = f"{STORAGE_URL}/{remote_path}"
-    content_type = get_content_type(local_path)
+def iter_files(root: str, prefix: str = ""):
+    """Yield ``(local_path, remote_path, stat)`` for every file under *root*.
+
+    Walks with os.scandir so the directory listing supplies the file type
+    and each file costs at most one stat. Remote paths always use ``/``.
+    """
+    with os.scandir(root) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for e in entries:
+        remote = prefix + e.name
+        if e.is_dir(follow_symlinks=False):
+            yield from iter_files(e.path, remote + "/")
+        elif e.is_file(follow_symlinks=False):
+            yield e.path, remote, e.stat(follow_symlinks=False)
+
+
+def load_manifest() -> dict:
+    """Read the upload manifest (empty if missing or unreadable)."""
+    try:
+        return json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: dict) -> None:
+    """Write the upload manifest atomically."""
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(tmp, MANIFEST_PATH)
+
+
+UPLOAD_CONCURRENCY = 32  # files in flight at once
+READ_CHUNK = 1024 * 1024  # 1 MiB per file read
+
+
+def make_async_client(concurrency: int = UPLOAD_CONCURRENCY) -> httpx.AsyncClient:
+    """Async client whose pool matches the upload fan-out (HTTP/2 if h2 is installed)."""
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    return httpx.AsyncClient(timeout=60, limits=limits, http2=HTTP2)
 
+
+async def _iter_file(local_path: str):
+    """Yield a file in READ_CHUNK pieces; reads run off the event loop."""
     with open(local_path, "rb") as f:
-        data = f.read()
+        while chunk := await asyncio.to_thread(f.read, READ_CHUNK):
+            yield chunk
+
+
+async def already_uploaded(client: httpx.AsyncClient, remote_path: str, size: int) -> bool:
+    """HEAD the object and check its Content-Length against the local *size*."""
+    try:
+        resp = await client.head(f"{STORAGE_URL}/{remote_path}", headers=AUTH_HEADERS)
+    except httpx.HTTPError:
+        return False
+    return (
+        resp.status_code == 200
+        and int(resp.headers.get("content-length", -1)) == size
+    )
+
+
+@http_retry
+async def _post_file(
+    client: httpx.AsyncClient, url: str, headers: dict, local_path: str
+) -> httpx.Response:
+    # A fresh generator per attempt, so a retry streams from the start
+    resp = await client.post(
+        url, headers=headers, content=_iter_file(local_path), timeout=60
+    )
+    return check_transient(resp)
+
+
+async def upload_file(
+    client: httpx.AsyncClient, local_path: str, remote_path: str, size: int
+) -> bool:
+    """Upload a single file to Supabase Storage.
+
+    The file is streamed in chunks with an explicit Content-Length – it is
+    never read into memory whole.
+    """
+    url = f"{STORAGE_URL}/{remote_path}"
+    content_type = get_content_type(local_path)
 
     headers = {
-        "apikey": SUPABASE_ANON_KEY,
-        "Authorization": f"Bearer {SUPABASE_ANON_KEY}",
+        **AUTH_HEADERS,
         "Content-Type": content_type,
+        "Content-Length": str(size),
         "x-upsert": "true",  # overwrite if exists
     }
 
     try:
-        resp = client.post(url, headers=headers, content=data, timeout=60)
+        resp = await _post_file(client, url, headers, local_path)
         if resp.status_code in (200, 201):
             return True
         else:
@@ -71,6 +177,66 @@ def upload_file(client: httpx.Client, local_path: Path, remote_path: str) -> boo
         return False
 
 
+async def upload_all(
+    all_files: list, total_size: int, manifest: dict
+) -> tuple[int, int, int, int]:
+    """Upload *all_files* with up to UPLOAD_CONCURRENCY in flight.
+
+    Files whose size and mtime match *manifest* are skipped outright; the
+    rest are HEADed first and only uploaded if the bucket copy differs in
+    size. *manifest* is updated in place.
+    Returns ``(uploaded, skipped, failed, uploaded_size)``.
+    """
+    sem = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    uploaded = 0
+    skipped = 0
+    failed = 0
+    done = 0
+    uploaded_size = 0
+    skipped_size = 0
+    start_time = time.time()
+
+    async def worker(local: str, remote: str, size: int, mtime_ns: int) -> None:
+        nonlocal uploaded, skipped, failed, done, uploaded_size, skipped_size
+        if manifest.get(remote) == [size, mtime_ns]:
+            ok = None  # unchanged since the last run – no request at all
+        else:
+            async with sem:
+                if await already_uploaded(client, remote, size):
+                    ok = None
+                else:
+                    ok = await upload_file(client, local, remote, size)
+        if ok is None:
+            skipped += 1
+            skipped_size += size
+            manifest[remote] = [size, mtime_ns]
+        elif ok:
+            uploaded += 1
+            uploaded_size += size
+            manifest[remote] = [size, mtime_ns]
+        else:
+            failed += 1
+        done += 1
+
+        # Progress every 50 files
+        if done % 50 == 0 or done == len(all_files):
+            elapsed = time.time() - start_time
+            pct = done / len(all_files) * 100
+            mb_done = uploaded_size / 1024 / 1024
+            rate = mb_done / elapsed * 60 if elapsed > 0 else 0
+            left = total_size - uploaded_size - skipped_size
+            eta_min = left / 1024 / 1024 / rate if rate > 0 else 0
+            print(f"  [{pct:5.1f}%] {uploaded}/{len(all_files)} files"
+                  f" ({mb_done:.0f}MB) {rate:.1f}MB/min"
+                  f" ETA={eta_min:.0f}min  skipped={skipped}  failed={failed}")
+
+    # One client for the whole run keeps TLS sessions warm
+    async with make_async_client() as client:
+        await asyncio.gather(*(worker(*t) for t in all_files))
+
+    return uploaded, skipped, failed, uploaded_size
+
+
 def main():
     print("=" * 60)
     print("   Upload Files to Supabase Storage")
@@ -88,54 +254,34 @@ def main():
     skipped_big = 0
     total_size = 0
 
-    for f in sorted(DATA_DIR.rglob("*")):
-        if f.is_file():
-            size = f.stat().st_size
-            if size <= MAX_FILE_SIZE:
-                rel = f.relative_to(DATA_DIR)
-                # Convert Windows path separators to forward slashes for storage
-                remote = str(rel).replace("\\", "/")
-                all_files.append((f, remote, size))
-                total_size += size
-            else:
-                skipped_big += 1
+    for local, remote, st in iter_files(str(DATA_DIR)):
+        size = st.st_size
+        if size <= MAX_FILE_SIZE:
+            all_files.append((local, remote, size, st.st_mtime_ns))
+            total_size += size
+        else:
+            skipped_big += 1
 
     print(f"  Files to upload: {len(all_files)}")
     print(f"  Total size: {total_size / 1024 / 1024:.1f} MB")
     print(f"  Skipped (>15MB): {skipped_big}")
     print()
 
-    client = httpx.Client(timeout=60)
-
-    uploaded = 0
-    failed = 0
-    uploaded_size = 0
+    manifest = load_manifest()
     start_time = time.time()
-
-    for i, (local, remote, size) in enumerate(all_files):
-        if upload_file(client, local, remote):
-            uploaded += 1
-            uploaded_size += size
-        else:
-            failed += 1
-
-        # Progress every 50 files
-        if (i + 1) % 50 == 0 or i == len(all_files) - 1:
-            elapsed = time.time() - start_time
-            pct = (i + 1) / len(all_files) * 100
-            mb_done = uploaded_size / 1024 / 1024
-            rate = mb_done / elapsed * 60 if elapsed > 0 else 0
-            eta_min = (total_size - uploaded_size) / 1024 / 1024 / rate if rate > 0 else 0
-            print(f"  [{pct:5.1f}%] {uploaded}/{len(all_files)} files"
-                  f" ({mb_done:.0f}MB) {rate:.1f}MB/min"
-                  f" ETA={eta_min:.0f}min  failed={failed}")
-
-    client.close()
+    try:
+        uploaded, skipped, failed, uploaded_size = asyncio.run(
+            upload_all(all_files, total_size, manifest)
+        )
+    finally:
+        # Keep what was confirmed even if the run is interrupted
+        save_manifest(manifest)
 
     elapsed = time.time() - start_time
     print()
     print("=" * 60)
     print(f"  Uploaded: {uploaded}/{len(all_files)} files")
+    print(f"  Skipped (already in bucket): {skipped}")
     print(f"  Failed: {failed}")
     print(f"  Size: {uploaded_size / 1024 / 1024:.1f} MB")
     print(f"  Time: {elapsed / 60:.1f} minutes")
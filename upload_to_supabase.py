@@ -7,21 +7,34 @@ Skips aerial_images table (as requested).
 
 Usage:
   python upload_to_supabase.py
+  python upload_to_supabase.py --batch-size 250   # same batch size for every table
+  python upload_to_supabase.py --gzip             # gzip large request bodies
 
 Requirements:
-  pip install httpx
+  pip install httpx tenacity
+  pip install "httpx[http2]"   # optional – multiplexes parallel uploads
+  pip install orjson           # optional – faster JSON encoding of batches
 """
 
-import json
+import argparse
+import asyncio
+import atexit
 import sqlite3
 import sys
 from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from supabase_http import (
+    HTTP2,
+    TIMEOUTS,
+    arequest,
+    encode_body,
+    open_sqlite,
+    request,
+)
+
+import httpx  # presence checked by supabase_http
 
-try:
-    import httpx
-except ImportError:
-    print("❌ Missing httpx. Run: pip install httpx")
-    sys.exit(1)
 
 # ─── Configuration ───────────────────────────────────────────────────────────
 SUPABASE_URL = "https://txltujmbkhsszpvsgujs.supabase.co"
@@ -46,13 +59,33 @@ HEADERS = {
 TABLES_TO_UPLOAD = ["gushim", "parcels", "plans", "documents", "plan_georef"]
 
 
-def get_local_data(table: str) -> list[dict]:
-    """Read all rows from a local SQLite table."""
-    conn = sqlite3.connect(str(DB_PATH))
-    conn.row_factory = sqlite3.Row
-    rows = conn.execute(f"SELECT * FROM {table}").fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+# One connection for the whole run, opened on first use
+_CONN: Optional[sqlite3.Connection] = None
+
+def get_db() -> sqlite3.Connection:
+    """The shared local DB connection (closed automatically at exit)."""
+    global _CONN
+    if _CONN is None:
+        _CONN = open_sqlite(DB_PATH)
+        atexit.register(_CONN.close)
+    return _CONN
+
+
+def count_local_rows(table: str) -> int:
+    """Row count of a local SQLite table."""
+    return get_db().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def iter_local_data(table: str, batch_size: int = 500) -> Iterator[list[dict]]:
+    """Stream rows of a local SQLite table as lists of up to *batch_size* dicts."""
+    cur = get_db().execute(f"SELECT * FROM {table}")
+    cur.arraysize = batch_size
+    cols = [c[0] for c in cur.description]
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        yield [dict(zip(cols, r)) for r in rows]
 
 
 def clear_table(client: httpx.Client, table: str):
@@ -61,7 +94,7 @@ def clear_table(client: httpx.Client, table: str):
     url = f"{SUPABASE_URL}/rest/v1/{table}?id=gt.0"
     if table == "gushim":
         url = f"{SUPABASE_URL}/rest/v1/{table}?gush=gt.0"
-    resp = client.delete(url, headers=HEADERS)
+    resp = request(client, "DELETE", url, headers=HEADERS)
     if resp.status_code in (200, 204):
         print(f"  🗑️  Cleared existing data from {table}")
     elif resp.status_code == 404:
@@ -72,44 +105,134 @@ def clear_table(client: httpx.Client, table: str):
     return True
 
 
-def upload_table(client: httpx.Client, table: str, rows: list[dict]):
-    """Upload rows to Supabase in batches."""
-    if not rows:
-        print(f"  ℹ️  {table}: no rows to upload")
-        return True
+# Batches of one table in flight at once (tables still go in FK order)
+UPLOAD_CONCURRENCY = 16
 
-    # For plans, documents, plan_georef – remove 'id' to let Supabase auto-generate
-    if table in ("parcels", "plans", "documents", "plan_georef"):
-        for r in rows:
-            r.pop("id", None)
+# Rows per POST – wide tables / big geojson get smaller batches
+DEFAULT_BATCH_SIZE = 500
+BATCH_SIZES = {
+    "gushim": 1000,
+    "parcels": 1000,
+    "plans": 500,
+    "documents": 500,
+    "plan_georef": 200,
+}
 
-    batch_size = 50
-    total = len(rows)
-    success_count = 0
 
-    for i in range(0, total, batch_size):
-        batch = rows[i : i + batch_size]
-        url = f"{SUPABASE_URL}/rest/v1/{table}"
+def make_async_client(concurrency: int = UPLOAD_CONCURRENCY) -> httpx.AsyncClient:
+    """Async client whose pool matches the upload fan-out (HTTP/2 if h2 is installed)."""
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    return httpx.AsyncClient(timeout=TIMEOUTS, limits=limits, http2=HTTP2)
+
+
+async def upload_table_async(
+    client: httpx.AsyncClient,
+    table: str,
+    batches: Iterable[list[dict]],
+    total: int,
+    concurrency: int = UPLOAD_CONCURRENCY,
+    compress: bool = False,
+):
+    """Upload row batches (from :func:`iter_local_data`) to Supabase.
+
+    Up to *concurrency* batches are POSTed at once; with *compress*, large
+    bodies are gzipped. Returns False if any batch failed.
+    """
+    if not total:
+        print(f"  ℹ️  {table}: no rows to upload")
+        return True
 
-        # Upsert for gushim (PK = gush), insert for others
-        headers = {**HEADERS}
-        if table == "gushim":
-            headers["Prefer"] = "return=representation,resolution=merge-duplicates"
+    url = f"{SUPABASE_URL}/rest/v1/{table}"
+    # Upsert for gushim (PK = gush), insert for others
+    headers = {**HEADERS}
+    if table == "gushim":
+        headers["Prefer"] = "return=representation,resolution=merge-duplicates"
 
-        resp = client.post(url, headers=headers, json=batch)
+    sem = asyncio.Semaphore(concurrency)
+    success_count = 0
 
+    async def send(batch: list[dict]) -> bool:
+        nonlocal success_count
+        body, extra = encode_body(batch, compress)
+        resp = await arequest(
+            client, "POST", url, headers={**headers, **extra}, content=body
+        )
+
+        if resp.status_code == 413 and len(batch) > 1:
+            # Body too large – split in half and send both parts
+            mid = len(batch) // 2
+            left = await send(batch[:mid])
+            right = await send(batch[mid:])
+            return left and right
         if resp.status_code in (200, 201):
             success_count += len(batch)
             print(f"  ✅ {table}: {success_count}/{total} rows uploaded")
-        else:
-            print(f"  ❌ {table} batch error: {resp.status_code}")
-            print(f"     {resp.text[:300]}")
-            return False
+            return True
+        print(f"  ❌ {table} batch error: {resp.status_code}")
+        print(f"     {resp.text[:300]}")
+        return False
 
+    async def send_slot(batch: list[dict]) -> bool:
+        try:
+            return await send(batch)
+        finally:
+            sem.release()
+
+    tasks = []
+    for batch in batches:
+        # For plans, documents, plan_georef – remove 'id' to let Supabase auto-generate
+        if table in ("parcels", "plans", "documents", "plan_georef"):
+            for r in batch:
+                r.pop("id", None)
+        await sem.acquire()
+        tasks.append(asyncio.create_task(send_slot(batch)))
+
+    ok = True
+    for result in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(result, Exception):
+            print(f"  ❌ {table} batch error: {result}")
+        ok = ok and result is True
+    return ok
+
+
+async def upload_all(
+    tables: list[str], batch_size: Optional[int] = None, compress: bool = False
+) -> bool:
+    """Upload *tables* in order; stops at the first table that fails.
+
+    *batch_size* overrides the per-table :data:`BATCH_SIZES`; *compress*
+    gzips large request bodies.
+    """
+    async with make_async_client() as client:
+        for table in tables:
+            print(f"\n📤 Uploading {table}...")
+            total = count_local_rows(table)
+            print(f"   Found {total} rows in local DB")
+
+            size = batch_size or BATCH_SIZES.get(table, DEFAULT_BATCH_SIZE)
+            batches = iter_local_data(table, size)
+            if not await upload_table_async(
+                client, table, batches, total, compress=compress
+            ):
+                print(f"\n❌ Failed on {table}. Stopping.")
+                return False
     return True
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Upload local SQLite -> Supabase")
+    parser.add_argument(
+        "--batch-size", type=int, default=None,
+        help="Rows per upload request for every table (default: per-table BATCH_SIZES)",
+    )
+    parser.add_argument(
+        "--gzip", action="store_true",
+        help="Send request bodies over 4 KB gzip-compressed (Content-Encoding: gzip)",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("   🚀 Upload Local DB → Supabase Cloud")
     print("=" * 60)
@@ -121,7 +244,7 @@ def main():
         print("❌ Local database not found!")
         sys.exit(1)
 
-    client = httpx.Client(timeout=30)
+    client = httpx.Client(timeout=TIMEOUTS)
 
     # First, clear tables in reverse order (FK dependencies)
     print("🗑️  Clearing existing cloud data...")
@@ -130,14 +253,8 @@ def main():
     print()
 
     # Then upload in order
-    for table in TABLES_TO_UPLOAD:
-        print(f"\n📤 Uploading {table}...")
-        rows = get_local_data(table)
-        print(f"   Found {len(rows)} rows in local DB")
-
-        if not upload_table(client, table, rows):
-            print(f"\n❌ Failed on {table}. Stopping.")
-            sys.exit(1)
+    if not asyncio.run(upload_all(TABLES_TO_UPLOAD, args.batch_size, args.gzip)):
+        sys.exit(1)
 
     print("\n" + "=" * 60)
     print("   ✅ All data uploaded successfully!")
@@ -146,7 +263,7 @@ def main():
     # Verify counts
     print("\n📊 Verification:")
     for table in TABLES_TO_UPLOAD:
-        local_count = len(get_local_data(table))
+        local_count = count_local_rows(table)
         url = f"{SUPABASE_URL}/rest/v1/{table}?select=count"
         headers = {**HEADERS, "Prefer": "count=exact"}
         resp = client.head(url, headers=headers)